@@ -1,26 +1,2059 @@
 import os
+import numpy as np
 import pandas as pd
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable, Callable
 from dataclasses import dataclass
+from collections import defaultdict, deque
+from functools import cached_property
 import concurrent.futures
+import multiprocessing
 from datetime import datetime, timedelta
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from CTkMessagebox import CTkMessagebox
 import json
+import re
+import unicodedata
+from difflib import SequenceMatcher
+import hashlib
+import tempfile
+import shutil
+import atexit
+import threading
 from pyvis.network import Network
 import webbrowser
+from openpyxl import load_workbook
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet desteği isteğe bağlıdır
+    pq = None
+
+# Keçid fayllarında olmalı sütunlar
+REQUIRED_COLUMNS = [
+    'Keçid zamanı', 
+    'Soyadı, Adı (Lat)', 
+    'İstiqamət', 
+    'Sərhəd nəzarət məntəqəsi'
+]
+
+# Dəstəklənən fayl növləri (dialoq pəncərələri üçün)
+FILE_TYPES = [
+    ("Keçid faylları", "*.xlsx *.xls *.csv *.csv.gz *.parquet"),
+    ("Excel faylları", "*.xlsx *.xls"),
+    ("CSV faylları", "*.csv *.csv.gz"),
+    ("Parquet faylları", "*.parquet")
+]
+
+# Axınla oxuma zamanı bir hissədəki sətir sayı
+CHUNK_ROWS = 50000
+
+# Cütlər bloklarla yaradılanda (top_k) bir blokdakı əsas tərəf sətirlərinin sayı
+PAIR_BLOCK_ROWS = 10000
+
+# Bu ölçüdən böyük müqayisə faylları hissə-hissə uyğunlaşdırılır
+STREAM_MIN_BYTES = 50 * 1024 * 1024
+
+# Oxunmuş faylların sütunlu keşi
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".tags_matching", "cache")
+CACHE_VERSION = 4
+
+# Maksimum vaxt fərqinin hədləri (dəqiqə)
+MIN_TIME_LIMIT = 5
+MAX_TIME_LIMIT = 60
+
+# Konvoy axtarışı: minimum qrup ölçüsü; pəncərədə hər şəxs zamanca ən çox bu qədər qonşu ilə cütləşir
+CONVOY_MIN_SIZE = 3
+CONVOY_MAX_WINDOW = 30
+CONVOY_PHASES = 4  # Hər keçidin düşdüyü sürüşdürülmüş pəncərə sayı
+
+# Əsas faylın özü ilə uyğunlaşdırılmasının nəticə açarı
+SELF_MATCH = "<öz-özünə>"
+
+# Diskə yazılan müvəqqəti verilənlərin (nəticələr, axınla oxunan hissələr) qovluq prefiksi
+SPILL_PREFIX = "tags_matching_spill_"
+
+# Fon analizinin gedişatının status panelində yenilənmə aralığı (ms)
+PROGRESS_INTERVAL_MS = 200
+
+# Analiz zamanı canlı göstərilən maksimum sətir (kateqoriya başına); sayğaclar hamısını sayır
+LIVE_MAX_ROWS = 100000
+
+# Axtarış yazma dayandıqdan bu qədər sonra icra olunur (ms)
+SEARCH_DELAY_MS = 250
+
+@dataclass(frozen=True)
+class MatchOptions:
+    """Uyğunlaşdırma parametrləri"""
+    max_time: int = 30          # Maksimum vaxt fərqi (dəqiqə)
+    cross_border: bool = True   # Fərqli sərhəd məntəqələri arasında uyğunluqlar
+    partitioned: bool = False   # Sərhəd və gün üzrə bölmələrlə uyğunlaşdır
+    top_k: int = 0              # Hər kateqoriyada saxlanılan ən yaxşı cütlər (0 = hamısı)
+    fuzzy_names: bool = False   # Ad variantlarını (Mammadov/Mamedov) eyni şəxs say
+
+EPOCH = datetime(1970, 1, 1)
+
+def format_minutes(minutes: int, fmt: str) -> str:
+    """Epoch dəqiqəsini mətnə çevir"""
+    return (EPOCH + timedelta(minutes=minutes)).strftime(fmt)
 
 @dataclass
 class MatchResult:
+    """Bir uyğunluq sətri (sabit tipli sahələr)
+
+    Zamanlar epoch dəqiqəsidir; çıxış sahələri yalnız tam uyğunluqlarda doludur.
+    """
+    __slots__ = ('person_a', 'person_b', 'border', 'entry_diff', 'exit_diff',
+                 'time_a', 'time_b', 'exit_time_a', 'exit_time_b')
     person_a: str
     person_b: str
-    date: str
-    time: str
-    time_diff: int
     border: str
+    entry_diff: int                 # Giriş (və ya tək keçid) vaxt fərqi, dəqiqə
+    exit_diff: Optional[int]        # Çıxış vaxt fərqi, dəqiqə
+    time_a: int
+    time_b: int
+    exit_time_a: Optional[int]
+    exit_time_b: Optional[int]
+    
+    @property
+    def is_complete(self) -> bool:
+        return self.exit_diff is not None
+    
+    @property
+    def time_diff(self) -> int:
+        return self.entry_diff
+    
+    @property
+    def date(self) -> str:
+        date = format_minutes(self.time_a, '%d.%m.%Y')
+        if self.is_complete:
+            date = f"{date} - {format_minutes(self.exit_time_a, '%d.%m.%Y')}"
+        return date
+    
+    @property
+    def time(self) -> str:
+        time = f"{format_minutes(self.time_a, '%H:%M')}-{format_minutes(self.time_b, '%H:%M')}"
+        if self.is_complete:
+            time = (f"{time} - {format_minutes(self.exit_time_a, '%H:%M')}"
+                    f"-{format_minutes(self.exit_time_b, '%H:%M')}")
+        return time
+    
+    @property
+    def diff_text(self) -> str:
+        """Cədvəl üçün vaxt fərqi mətni"""
+        if self.is_complete:
+            return f"{self.entry_diff}/{self.exit_diff} dk"
+        return f"{self.entry_diff} dk"
+
+class SeenKeys:
+    """Görülmüş 64 bitlik açar heşlərinin çoxluğu
+
+    Heşlər ölçüsü azalan sıralanmış qaçışlarda saxlanır; yeni qaçış
+    özündən kiçik olmayan qaçışlarla birləşdirilir, ona görə qaçış sayı
+    loqarifmik qalır. Yaddaş açar başına 8 baytdır.
+    """
+    
+    def __init__(self):
+        self.runs: List[np.ndarray] = []
+    
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+    
+    def add(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        run = np.sort(hashes)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        self.runs.append(run)
+
+def unique_masks(stores: List['MatchStore'], symmetric: bool = False,
+                 chunk_rows: int = CHUNK_ROWS) -> List[np.ndarray]:
+    """Mağazalar boyu ilk rast gəlinən cütləri saxlayan maskalar
+
+    Açarlar chunk_rows sətirlik hissələrlə heşlənir və SeenKeys ilə
+    yoxlanılır, ona görə diskə yazılmış mağazalar yaddaşa tam yüklənmir.
+    """
+    if not stores:
+        return []
+    
+    # Kodlar ortaq hovuzda olmalıdır
+    pool = next((store.pool for store in stores if len(store)), stores[0].pool)
+    seen = SeenKeys()
+    masks = []
+    for store in stores:
+        lookup = None if store.pool is pool else pool.encode(store.strings)
+        keep = np.zeros(len(store), dtype=bool)
+        for start in range(0, len(store), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            part = store.take(rows)
+            if lookup is not None:
+                part = part.recode(pool, lookup)
+            hashes = pd.util.hash_pandas_object(part.pair_keys(symmetric), index=False).to_numpy()
+            new = ~pd.Series(hashes).duplicated().to_numpy() & ~seen.contains(hashes)
+            seen.add(hashes[new])
+            keep[rows] = new
+        masks.append(keep)
+    return masks
+
+def empty_results() -> Dict[str, 'MatchStore']:
+    """Boş nəticə mağazaları"""
+    return {
+        'entry': MatchStore.empty(),
+        'exit': MatchStore.empty(),
+        'complete': MatchStore.empty(complete=True)
+    }
+
+# Transliterasiya fərqlərini aradan qaldıran əvəzləmələr (kiçik hərflərə çevrildikdən sonra)
+NAME_REPLACEMENTS = [('ə', 'a'), ('ı', 'i'), ('sh', 's'), ('ch', 'c'), ('kh', 'x'),
+                     ('zh', 'j'), ('gh', 'g')]
+
+def normalize_name(name) -> Tuple[str, ...]:
+    """Adı müqayisə üçün normallaşdırılmış sözlərə çevir"""
+    if not isinstance(name, str):
+        return ()
+    
+    text = name.lower()
+    for old, new in NAME_REPLACEMENTS:
+        text = text.replace(old, new)
+    
+    # Diakritikleri at (ş -> s, ç -> c, ö -> o ...)
+    text = ''.join(ch for ch in unicodedata.normalize('NFKD', text)
+                   if not unicodedata.combining(ch))
+    # Aliyev -> Aliev, Mammadov -> Mamadov
+    text = re.sub(r'(?<=[aeiou])y(?=[aeiou])', '', text)
+    text = re.sub(r'([a-z])\1+', r'\1', text)
+    return tuple(re.findall(r'[a-z0-9]+', text))
+
+def similar_tokens(first: str, second: str, min_ratio: float = 0.85) -> bool:
+    """İki normallaşdırılmış söz eyni adın variantı ola bilərmi"""
+    if first == second:
+        return True
+    # Kısa kelimelerde (Ali/Vali) tek harf farkı farklı isim demektir
+    if min(len(first), len(second)) < 5:
+        return False
+    return SequenceMatcher(None, first, second).ratio() >= min_ratio
+
+class NameIndex:
+    """Ad variantlarını eyni şəxs identifikatoruna bağlayan indeks
+
+    Adlar normallaşdırılmış sözlərə bölünür. Oxşar sözlər yalnız ortaq
+    3-qram bloklarında müqayisə olunur və union-find ilə birləşdirilir;
+    sözləri eyni qrupa düşən adlar eyni şəxs sayılır. Müqayisələr unikal
+    sözlər üzərində bir dəfə aparılır, cüt başına iş massivdə bir axtarışdır.
+    Hovuz böyüdükdə yalnız yeni adlar və söz qrupu birləşən adlar yenidən
+    açarlanır; şəxs qrupları birləşəndə kiçik qrupun kodları köçürülür.
+    """
+    
+    BLOCK_LIMIT = 100  # Bundan böyük bloklar (çox yayğın 3-qramlar) axtarılmır
+    
+    def __init__(self):
+        self.name_tokens: List[Tuple[int, ...]] = []
+        self.token_ids: Dict[str, int] = {}
+        self.tokens: List[str] = []
+        self.parent: List[int] = []
+        self.blocks: Dict[str, List[int]] = defaultdict(list)
+        self.merged: List[int] = []                        # Son yeniləmədən bəri birləşən köklər
+        self.root_codes: Dict[int, List[int]] = defaultdict(list)  # Söz kökü -> adlar
+        self.code_keys: Dict[int, Tuple[int, ...]] = {}   # Ad -> söz kökləri açarı
+        self.key_codes: Dict[Tuple[int, ...], int] = {}   # Açar -> həmin açarlı bir ad
+        self.members: Dict[int, List[int]] = {}           # Şəxs identifikatoru -> adlar
+        self._identities = np.zeros(0, dtype=np.int32)
+    
+    def find(self, token: int) -> int:
+        while self.parent[token] != token:
+            self.parent[token] = self.parent[self.parent[token]]
+            token = self.parent[token]
+        return token
+    
+    def union(self, first: int, second: int):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+            self.merged.append(max(first, second))
+    
+    def add_token(self, token: str) -> int:
+        """Sözü indeksə əlavə et və oxşar sözlərlə birləşdir"""
+        token_id = self.token_ids.get(token)
+        if token_id is not None:
+            return token_id
+        
+        token_id = self.token_ids[token] = len(self.tokens)
+        self.tokens.append(token)
+        self.parent.append(token_id)
+        if len(token) < 5:
+            return token_id
+        
+        grams = {token[i:i + 3] for i in range(len(token) - 2)}
+        shared = defaultdict(int)
+        for gram in grams:
+            block = self.blocks[gram]
+            if len(block) < self.BLOCK_LIMIT:
+                for other in block:
+                    shared[other] += 1
+                block.append(token_id)
+        
+        # Yalnız 3-qramlarının yarısını paylaşan sözlər müqayisə olunur
+        needed = max(1, len(grams) // 2)
+        for other, count in shared.items():
+            if count >= needed and similar_tokens(token, self.tokens[other]):
+                self.union(token_id, other)
+        return token_id
+    
+    def merge_identities(self, first: int, second: int):
+        """İki şəxs qrupunu birləşdir (kiçik qrupun kodları köçürülür)"""
+        if first == second:
+            return
+        if len(self.members[first]) < len(self.members[second]):
+            first, second = second, first
+        moved = self.members.pop(second)
+        self._identities[moved] = first
+        self.members[first].extend(moved)
+    
+    def identities(self, strings: List) -> np.ndarray:
+        """Hər kod üçün şəxs identifikatoru"""
+        start = len(self.name_tokens)
+        if start == len(strings):
+            return self._identities
+        
+        for code in range(start, len(strings)):
+            self.name_tokens.append(tuple(
+                self.add_token(token) for token in normalize_name(strings[code])
+            ))
+        self._identities = np.concatenate([
+            self._identities, np.arange(start, len(strings), dtype=np.int32)
+        ])
+        
+        # Kökü birləşən sözləri daşıyan köhnə adların açarı dəyişib
+        dirty = set()
+        for root in self.merged:
+            codes = self.root_codes.pop(root, [])
+            dirty.update(codes)
+            self.root_codes[self.find(root)].extend(codes)
+        self.merged = []
+        
+        for code in range(start, len(strings)):
+            if self.name_tokens[code]:
+                self.members[code] = [code]
+                for root in {self.find(token) for token in self.name_tokens[code]}:
+                    self.root_codes[root].append(code)
+                dirty.add(code)
+        
+        # Eyni açarlı adlar eyni şəxsdir
+        for code in sorted(dirty):
+            old_key = self.code_keys.get(code)
+            if old_key is not None:
+                self.key_codes.pop(old_key, None)
+            key = tuple(self.find(token) for token in self.name_tokens[code])
+            self.code_keys[code] = key
+            other = self.key_codes.setdefault(key, code)
+            self.merge_identities(int(self._identities[other]), int(self._identities[code]))
+        return self._identities
+
+class StringPool:
+    """Ad və sərhədlər üçün sıx tam ədəd kodları verən lüğət
+
+    Kodlar yalnız artır, ona görə bir hovuzla kodlanmış massivlər hovuz
+    böyüdükdən sonra da etibarlı qalır. Yeni dəyərlər kilid altında əlavə
+    olunur ki, fon analizi və UI eyni hovuzu paylaşa bilsin.
+    """
+    
+    def __init__(self, strings=()):
+        self.strings: List = []
+        self.index: Dict = {}
+        self._array: Optional[np.ndarray] = None
+        self._names: Optional[NameIndex] = None
+        self._lock = threading.Lock()
+        for value in strings:
+            self.add(value)
+    
+    def __getstate__(self):
+        # Kilit proses havuzuna gönderilemez
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.strings)
+    
+    def add(self, value) -> int:
+        """Dəyərin kodunu qaytar, yoxdursa əlavə et"""
+        with self._lock:
+            return self._add(value)
+    
+    def _add(self, value) -> int:
+        if value is None or (isinstance(value, str) and not value.strip()) or pd.isna(value):
+            value = np.nan  # Boş hücreler (None, NaN, boş metin) tek bir kodu paylaşır
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+    
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """Massivi kodlara çevir (lüğət axtarışı yalnız unikal dəyərlər üçün)"""
+        local_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        with self._lock:
+            lookup = np.array([self._add(value) for value in uniques], dtype=np.int32)
+        return lookup[local_codes] if len(local_codes) else np.array([], dtype=np.int32)
+    
+    def identities(self) -> np.ndarray:
+        """Kod -> şəxs identifikatoru (ad variantları eyni identifikatoru paylaşır)"""
+        if self._names is None:
+            self._names = NameIndex()
+        return self._names.identities(self.strings)
+    
+    def array(self) -> np.ndarray:
+        """Kod -> dəyər massivi"""
+        if self._array is None or len(self._array) != len(self.strings):
+            self._array = np.array(self.strings + [None], dtype=object)[:-1]
+        return self._array
+    
+    def missing(self) -> np.ndarray:
+        """Kod -> dəyər boşdur maskası (boş dəyərlər add-də NaN-a çevrilir)"""
+        return pd.isna(self.array())
+
+@dataclass
+class MatchSummary:
+    """Nəticə mağazasının bir dəfə hesablanan toplu göstəriciləri
+
+    Cütlər sırasız (A/B = B/A) sayılır. pair_ids hər sətrin cüt nömrəsidir;
+    pairs cədvəlində cütün təkrar sayı, ilk/son birgə keçidi (epoch dəqiqə)
+    və fərqli sərhəd sayı saxlanır; cədvəlin "Təkrar" və "Birgə Dövr"
+    sütunları buradan oxunur. order standart sıralamadır.
+    """
+    person_counts: np.ndarray
+    pair_ids: np.ndarray
+    pairs: pd.DataFrame
+    order: np.ndarray
+    
+    @cached_property
+    def repeats(self) -> np.ndarray:
+        """Hər sətir üçün cütün təkrar sayı"""
+        return self.pairs['count'].to_numpy()[self.pair_ids]
+    
+    def period_text(self, index: int) -> str:
+        """Sətrin cütü üçün ilk/son birgə keçid tarixi və fərqli məntəqə sayı"""
+        pair = self.pair_ids[index]
+        first = format_minutes(int(self.pairs['first'].iat[pair]), '%d.%m.%Y')
+        last = format_minutes(int(self.pairs['last'].iat[pair]), '%d.%m.%Y')
+        period = first if first == last else f"{first} - {last}"
+        return f"{period} ({self.pairs['borders'].iat[pair]} məntəqə)"
+
+class MatchStore:
+    """Uyğunluqların massivlərdə saxlanması
+
+    Şəxslər və sərhədlər lüğət kodları, zamanlar epoch dəqiqələri, vaxt
+    fərqləri isə rəqəmlə saxlanır. Mətnlər yalnız sətir göstəriləndə yaranır.
+    Tam uyğunluqlarda çıxış sütunları da doldurulur.
+    """
+    
+    COLUMNS = ['person_a', 'person_b', 'border', 'time_a', 'time_b', 'time_diff']
+    EXIT_COLUMNS = ['exit_time_a', 'exit_time_b', 'exit_diff']
+    
+    def __init__(self, pool: StringPool, person_a: np.ndarray, person_b: np.ndarray,
+                 border: np.ndarray, time_a: np.ndarray, time_b: np.ndarray,
+                 time_diff: np.ndarray, exit_time_a: Optional[np.ndarray] = None,
+                 exit_time_b: Optional[np.ndarray] = None,
+                 exit_diff: Optional[np.ndarray] = None):
+        self.pool = pool
+        self.person_a = person_a
+        self.person_b = person_b
+        self.border = border
+        self.time_a = time_a
+        self.time_b = time_b
+        self.time_diff = time_diff
+        self.exit_time_a = exit_time_a
+        self.exit_time_b = exit_time_b
+        self.exit_diff = exit_diff
+        self._summary: Optional[MatchSummary] = None
+        self._search_index: Optional['SearchIndex'] = None
+    
+    @classmethod
+    def empty(cls, complete: bool = False) -> 'MatchStore':
+        codes = np.array([], dtype=np.int32)
+        times = np.array([], dtype=np.int64)
+        exit_columns = (times, times, codes) if complete else (None, None, None)
+        return cls(StringPool(), codes, codes, codes,
+                   times, times, codes, *exit_columns)
+    
+    @property
+    def strings(self) -> np.ndarray:
+        return self.pool.array()
+    
+    @property
+    def is_complete(self) -> bool:
+        return self.exit_time_a is not None
+    
+    def columns(self) -> List[str]:
+        return self.COLUMNS + (self.EXIT_COLUMNS if self.is_complete else [])
+    
+    def __len__(self) -> int:
+        return len(self.person_a)
+    
+    def __repr__(self) -> str:
+        return f"MatchStore({len(self)} uyğunluq)"
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, column).nbytes for column in self.columns())
+    
+    @property
+    def is_spilled(self) -> bool:
+        return isinstance(self.person_a, np.memmap)
+    
+    def spill(self, directory: str) -> 'MatchStore':
+        """Sütunları diskə yaz və yaddaş xəritəsi (memmap) ilə yenidən aç"""
+        if self.is_spilled or not len(self):
+            return self
+        return MatchStore.concat([self], self.is_complete, directory)
+    
+    def discard(self):
+        """Diskə yazılmış sütun fayllarını sil"""
+        if not self.is_spilled:
+            return
+        for column in self.columns():
+            try:
+                os.remove(getattr(self, column).filename)
+            except OSError:
+                pass  # Windows'ta açık memmap silinemez, çıkışta temizlenir
+    
+    def take(self, indices: np.ndarray) -> 'MatchStore':
+        """Seçilmiş sətirlərdən (verilən sıra ilə) yeni mağaza yarat"""
+        return MatchStore(self.pool, **{
+            column: getattr(self, column)[indices] for column in self.columns()
+        })
+    
+    def intern(self, pool: StringPool) -> 'MatchStore':
+        """Kodları verilən hovuza köçür"""
+        if pool is self.pool:
+            return self
+        return self.recode(pool, pool.encode(self.strings))
+    
+    def recode(self, pool: StringPool, lookup: np.ndarray) -> 'MatchStore':
+        """Kodları hazır köçürmə massivi (köhnə kod -> yeni kod) ilə dəyiş"""
+        columns = {column: getattr(self, column) for column in self.columns()}
+        for column in ('person_a', 'person_b', 'border'):
+            columns[column] = lookup[columns[column]]
+        return MatchStore(pool, **columns)
+    
+    @classmethod
+    def concat(cls, stores: List['MatchStore'], complete: bool = False,
+               directory: Optional[str] = None,
+               masks: Optional[List[np.ndarray]] = None) -> 'MatchStore':
+        """Mağazaları ardıcıl birləşdir (kodlar ilk mağazanın hovuzuna köçürülür)
+
+        directory verilərsə sütunlar həmin qovluqda .npy fayllarına hissə-hissə
+        yazılır və memmap kimi açılır; nəticə yaddaşa tam yüklənmir. masks
+        verilərsə hər mağazadan yalnız seçilmiş sətirlər götürülür.
+        """
+        if masks is None:
+            masks = [None] * len(stores)
+        parts = [(store, mask) for store, mask in zip(stores, masks)
+                 if len(store) and (mask is None or mask.any())]
+        if not parts:
+            return cls.empty(complete)
+        
+        pool = parts[0][0].pool
+        parts = [(store.intern(pool), mask) for store, mask in parts]
+        
+        def values(store, mask, column):
+            column = getattr(store, column)
+            return column if mask is None else column[mask]
+        
+        if directory is None:
+            return cls(pool, **{
+                column: np.concatenate([values(store, mask, column) for store, mask in parts])
+                for column in parts[0][0].columns()
+            })
+        
+        os.makedirs(directory, exist_ok=True)
+        total = sum(len(store) if mask is None else int(np.count_nonzero(mask))
+                    for store, mask in parts)
+        columns = {}
+        for column in parts[0][0].columns():
+            fd, path = tempfile.mkstemp(dir=directory, suffix='.npy')
+            os.close(fd)
+            out = np.lib.format.open_memmap(
+                path, mode='w+', dtype=getattr(parts[0][0], column).dtype, shape=(total,)
+            )
+            start = 0
+            for store, mask in parts:
+                part = values(store, mask, column)
+                out[start:start + len(part)] = part
+                start += len(part)
+            out.flush()
+            del out
+            columns[column] = np.load(path, mmap_mode='r')
+        return cls(pool, **columns)
+    
+    def pair_keys(self, symmetric: bool = False) -> pd.DataFrame:
+        """Təkrarları tapmaq üçün kanonik cüt açarları (şəxslər, sərhəd, zamanlar)
+
+        symmetric açıqdırsa A/B və B/A eyni açara çevrilir. Sərhəd yalnız A-nın
+        keçidinə aid olduğu üçün bu halda açara daxil edilmir; keçidləri
+        şəxslər və zamanlar müəyyən edir.
+        """
+        keys = {column: np.asarray(getattr(self, column)) for column in
+                ['person_a', 'person_b', 'border', 'time_a', 'time_b']}
+        if self.is_complete:
+            keys['exit_time_a'] = np.asarray(self.exit_time_a)
+            keys['exit_time_b'] = np.asarray(self.exit_time_b)
+        
+        if symmetric:
+            del keys['border']
+            swap = keys['person_a'] > keys['person_b']
+            for first, second in [('person_a', 'person_b'), ('time_a', 'time_b'),
+                                  ('exit_time_a', 'exit_time_b')]:
+                if first in keys:
+                    keys[first], keys[second] = (np.where(swap, keys[second], keys[first]),
+                                                 np.where(swap, keys[first], keys[second]))
+        return pd.DataFrame(keys)
+    
+    @property
+    def summary(self) -> MatchSummary:
+        """Şəxs və cüt sayları, sıralama (ilk müraciətdə bir dəfə hesablanır)"""
+        if self._summary is None:
+            self._summary = self.summarize()
+        return self._summary
+    
+    def summarize(self) -> MatchSummary:
+        """Cüt səviyyəli toplu cədvəli qrup əməliyyatları ilə qur"""
+        person_a, person_b = np.asarray(self.person_a), np.asarray(self.person_b)
+        size = max(len(self.pool), 1)
+        keys = (np.minimum(person_a, person_b).astype(np.int64) * size +
+                np.maximum(person_a, person_b))
+        pair_keys, pair_ids = np.unique(keys, return_inverse=True)
+        
+        grouped = pd.DataFrame({
+            'pair': pair_ids,
+            'time': np.asarray(self.time_a),
+            'border': np.asarray(self.border)
+        }).groupby('pair')
+        pairs = pd.DataFrame({
+            'person_a': (pair_keys // size).astype(np.int32),
+            'person_b': (pair_keys % size).astype(np.int32),
+            'count': grouped.size().to_numpy(),
+            'first': grouped['time'].min().to_numpy(),
+            'last': grouped['time'].max().to_numpy(),
+            'borders': grouped['border'].nunique().to_numpy()
+        })
+        
+        person_counts = self.person_counts(np.arange(len(self)))
+        order = self.rank_order(np.arange(len(self)), person_counts)
+        return MatchSummary(person_counts, pair_ids, pairs, order)
+    
+    def rank_order(self, rows: Optional[np.ndarray] = None,
+                   counts: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sətir indekslərini sırala: şəxslərin uyğunluq sayı azalan, sonra vaxt fərqi artan
+
+        rows verilərsə yalnız həmin sətirlər (və onların sayları) nəzərə alınır.
+        """
+        if rows is None:
+            return self.summary.order
+        if counts is None:
+            counts = self.person_counts(rows)
+        person_a, person_b = self.person_a[rows], self.person_b[rows]
+        return rows[np.lexsort((self.time_diff[rows], -(counts[person_a] + counts[person_b])))]
+    
+    def top(self, k: int) -> 'MatchStore':
+        """Sıralamaya görə ən yaxşı k sətri saxla"""
+        if len(self) <= k:
+            return self
+        return self.take(np.sort(self.rank_order()[:k]))
+    
+    def person_counts(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Hər şəxs kodu üçün uyğunluq sayı"""
+        if rows is None:
+            return self.summary.person_counts
+        person_a, person_b = self.person_a[rows], self.person_b[rows]
+        return (np.bincount(person_a, minlength=len(self.pool)) +
+                np.bincount(person_b, minlength=len(self.pool)))
+    
+    def days(self) -> np.ndarray:
+        """Şəxs A-nın keçid günü (epoch günü)"""
+        return self.time_a // 1440
+    
+    def date_keys(self) -> np.ndarray:
+        """Tarix mətnini təyin edən gün açarı (tam uyğunluqda giriş+çıxış günü)"""
+        if self.is_complete:
+            return (self.time_a // 1440) * (1 << 20) + self.exit_time_a // 1440
+        return self.time_a // 1440
+    
+    def date_text(self, key: int) -> str:
+        """date_keys açarının göstərilən tarix mətni"""
+        if self.is_complete:
+            entry_day, exit_day = key >> 20, key & ((1 << 20) - 1)
+            return (f"{format_minutes(entry_day * 1440, '%d.%m.%Y')} - "
+                    f"{format_minutes(exit_day * 1440, '%d.%m.%Y')}")
+        return format_minutes(key * 1440, '%d.%m.%Y')
+    
+    @property
+    def search_index(self) -> 'SearchIndex':
+        """Axtarış indeksi (ilk axtarışda bir dəfə qurulur)"""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self)
+        return self._search_index
+    
+    def row(self, i: int) -> MatchResult:
+        """Bir sətri qeyd obyektinə çevir"""
+        complete = self.is_complete
+        return MatchResult(
+            person_a=self.strings[self.person_a[i]],
+            person_b=self.strings[self.person_b[i]],
+            border=self.strings[self.border[i]],
+            entry_diff=int(self.time_diff[i]),
+            exit_diff=int(self.exit_diff[i]) if complete else None,
+            time_a=int(self.time_a[i]),
+            time_b=int(self.time_b[i]),
+            exit_time_a=int(self.exit_time_a[i]) if complete else None,
+            exit_time_b=int(self.exit_time_b[i]) if complete else None
+        )
+    
+    def __iter__(self) -> Iterator[MatchResult]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+class SearchIndex:
+    """Nəticə mağazasında mətn axtarışı üçün indeks
+
+    Sətirlərdə görünən terminlər (şəxs adları, sərhədlər, tarix mətnləri)
+    bir dəfə kiçik hərflərlə siyahıya alınır və terminlər üzərində trigram
+    indeksi qurulur. Sətirlər sıralama qaydasında termin nömrələri kimi
+    saxlanır; sorğu yalnız namizəd terminləri yoxlayır, uyğun terminlərin
+    maskası isə sətirlərə vektor şəklində tətbiq olunur.
+    """
+    
+    def __init__(self, store: MatchStore):
+        self.order = store.rank_order()
+        count = len(self.order)
+        
+        # Terimler: kullanılan havuz kodları + benzersiz tarih metinleri
+        columns = [np.asarray(getattr(store, column))[self.order]
+                   for column in ('person_a', 'person_b', 'border')]
+        used = np.zeros(len(store.pool), dtype=bool)
+        for column in columns:
+            used[column] = True
+        codes = np.flatnonzero(used)
+        local = np.zeros(len(store.pool), dtype=np.int32)
+        local[codes] = np.arange(len(codes), dtype=np.int32)
+        date_ids, date_keys = pd.factorize(np.asarray(store.date_keys())[self.order], sort=True)
+        self.terms = ([str(value).lower() for value in store.strings[codes]] +
+                      [store.date_text(key) for key in date_keys.tolist()])
+        
+        # Satırların terim numaraları (sıralama düzeninde)
+        self.row_terms = [local[column] for column in columns] + [
+            (len(codes) + date_ids).astype(np.int32)
+        ]
+        
+        # Trigram -> terimler (anahtar = trigram kodu * terim sayısı + terim)
+        lengths = np.fromiter((len(term) for term in self.terms), dtype=np.int64, count=len(self.terms))
+        grams = [term[i:i + 3] for term in self.terms for i in range(len(term) - 2)]
+        owners = np.repeat(np.arange(len(self.terms)), np.maximum(lengths - 2, 0))
+        gram_codes, gram_values = pd.factorize(np.array(grams, dtype=object))
+        width = max(len(self.terms), 1)
+        keys = np.sort(gram_codes.astype(np.int64) * width + owners)
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+        self.gram_index = pd.Index(gram_values)
+        self.gram_terms = keys % width
+        self.gram_starts = np.searchsorted(keys // width, np.arange(len(gram_values) + 1))
+    
+    def candidate_terms(self, text: str) -> np.ndarray:
+        """Sorğunun bütün trigramlarını daşıyan terminlər (qısa sorğuda hamısı)"""
+        if len(text) < 3:
+            return np.arange(len(self.terms))
+        grams = self.gram_index.get_indexer(list({text[i:i + 3] for i in range(len(text) - 2)}))
+        if (grams < 0).any():
+            return np.array([], dtype=np.int64)
+        postings = sorted((self.gram_terms[self.gram_starts[g]:self.gram_starts[g + 1]] for g in grams),
+                          key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return candidates
+    
+    def find(self, text: str) -> np.ndarray:
+        """Mətn olan sətirlərin indeksləri (sıralama qaydasında)"""
+        text = text.lower()
+        if not text:
+            return self.order
+        
+        matched = [term for term in self.candidate_terms(text).tolist() if text in self.terms[term]]
+        if not matched:
+            return self.order[:0]
+        
+        hit = np.zeros(len(self.terms), dtype=bool)
+        hit[matched] = True
+        found = hit[self.row_terms[0]]
+        for terms in self.row_terms[1:]:
+            found |= hit[terms]
+        return self.order[found]
+
+def to_epoch_seconds(parsed: pd.Series) -> np.ndarray:
+    """Datetime sütununu epoch saniyələrinə çevir (NaT üçün NaN)"""
+    seconds = parsed.to_numpy(dtype='datetime64[s]').astype('int64').astype('float64')
+    seconds[parsed.isna().to_numpy()] = np.nan
+    return seconds
+
+def sweep_pairs(left_times: np.ndarray, right_times: np.ndarray, window: float,
+                right_order: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Zaman pəncərəsinə düşən (sol, sağ) indeks cütlərini tap
+
+    Sağ tərəf zamana görə sıralanır, hər sol sətir üçün pəncərənin sərhədləri
+    searchsorted ilə tapılır. Nəticə orijinal sətir sırası ilə qaytarılır.
+    """
+    if right_order is None:
+        right_order = np.argsort(right_times, kind='stable')
+    
+    # NaT olan sətirlər heç vaxt uyğunlaşmır (argsort onları sona qoyur)
+    left_valid = np.flatnonzero(~np.isnan(left_times))
+    order = right_order[:np.count_nonzero(~np.isnan(right_times))]
+    sorted_times = right_times[order]
+    
+    lows = np.searchsorted(sorted_times, left_times[left_valid] - window, side='left')
+    highs = np.searchsorted(sorted_times, left_times[left_valid] + window, side='right')
+    counts = highs - lows
+    
+    # Hər sol sətir üçün pəncərədəki bütün sağ sətirləri aç
+    left_idx = np.repeat(left_valid, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    right_idx = order[np.repeat(lows, counts) + offsets]
+    
+    # Əvvəlki iç-içə dövrün sırasını qoru
+    sort = np.lexsort((right_idx, left_idx))
+    return left_idx[sort], right_idx[sort]
+
+def iter_self_pairs(times: np.ndarray, window: float, order: np.ndarray,
+                    block_rows: int = PAIR_BLOCK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Bir massivin öz-özü ilə pəncərə cütlərini bloklarla qaytar
+
+    Sıralanmış zamanlarda hər sətir yalnız özündən sonrakı sətirlərlə
+    cütləşir (üçbucaq). Hər blok sıralanmış block_rows mövqenin cütləridir;
+    cüt (kiçik sətir, böyük sətir) kimi qaytarılır.
+    """
+    valid = order[:np.count_nonzero(~np.isnan(times))]
+    sorted_times = times[valid]
+    
+    for start in range(0, len(valid), block_rows):
+        positions = np.arange(start, min(start + block_rows, len(valid)))
+        highs = np.searchsorted(sorted_times, sorted_times[positions] + window, side='right')
+        counts = highs - positions - 1
+        
+        first = np.repeat(positions, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows1, rows2 = valid[first], valid[first + 1 + offsets]
+        
+        idx1, idx2 = np.minimum(rows1, rows2), np.maximum(rows1, rows2)
+        sort = np.lexsort((idx2, idx1))
+        yield idx1[sort], idx2[sort]
+
+@dataclass
+class DirectionData:
+    """Bir istiqamət üzrə hazırlanmış keçid sütunları"""
+    times: np.ndarray    # Epoch saniyə (NaT üçün NaN)
+    order: np.ndarray    # Zamana görə sıralanmış sətir indeksləri
+    names: np.ndarray    # Hovuz kodları
+    borders: np.ndarray  # Hovuz kodları
+
+class PreparedDataset:
+    """Uyğunlaşdırma üçün bir dəfə hazırlanmış keçid faylı
+
+    Fayl istiqamətə görə bölünür, zamanlar çevrilir, adlar və sərhədlər
+    hovuz kodlarına çevrilir; eyni obyekt fayl dəyişənə qədər bütün
+    uyğunlaşdırmalarda istifadə olunur.
+    """
+    
+    def __init__(self, directions: Dict[str, DirectionData], pool: StringPool,
+                 source: Optional[str] = None):
+        self.directions = directions
+        self.pool = pool
+        self.source = source
+        self.mtime = os.path.getmtime(source) if source else None
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, source: Optional[str] = None,
+                   pool: Optional[StringPool] = None) -> 'PreparedDataset':
+        """DataFrame-dən hazırlanmış verilənlər yarat"""
+        pool = pool if pool is not None else StringPool()
+        directions = {}
+        for direction in ['Giriş', 'Çıxış']:
+            filtered = df[df['İstiqamət'] == direction]
+            parsed = pd.to_datetime(filtered['Keçid zamanı'], format='%d.%m.%Y %H:%M')
+            times = to_epoch_seconds(parsed)
+            directions[direction] = DirectionData(
+                times=times,
+                order=np.argsort(times, kind='stable'),
+                names=pool.encode(filtered['Soyadı, Adı (Lat)'].to_numpy(dtype=object)),
+                borders=pool.encode(filtered['Sərhəd nəzarət məntəqəsi'].to_numpy(dtype=object))
+            )
+        return cls(directions, pool, source)
+    
+    @classmethod
+    def from_file(cls, path: str) -> 'PreparedDataset':
+        """Faylı keşdən yüklə, keş etibarsızdırsa fayldan oxu və keşlə"""
+        dataset = load_cached_dataset(path)
+        if dataset is None:
+            pool = StringPool()
+            parts = [cls.from_frame(chunk, pool=pool) for chunk in iter_file_chunks(path)]
+            dataset = cls.concat(parts, pool, source=path)
+            save_cached_dataset(path, dataset)
+        return dataset
+    
+    @classmethod
+    def concat(cls, parts: List['PreparedDataset'], pool: StringPool,
+               source: Optional[str] = None) -> 'PreparedDataset':
+        """Hissə-hissə hazırlanmış verilənləri birləşdir"""
+        parts = [part.intern(pool) for part in parts]
+        directions = {}
+        for direction in ['Giriş', 'Çıxış']:
+            datas = [part.directions[direction] for part in parts]
+            fields = {
+                field: np.concatenate([getattr(data, field) for data in datas])
+                if datas else np.array([], dtype=np.int32)
+                for field in ['names', 'borders']
+            }
+            times = (np.concatenate([data.times for data in datas])
+                     if datas else np.array([], dtype='float64'))
+            directions[direction] = DirectionData(
+                times=times,
+                order=np.argsort(times, kind='stable'),
+                **fields
+            )
+        return cls(directions, pool, source)
+    
+    def intern(self, pool: StringPool) -> 'PreparedDataset':
+        """Ad və sərhəd kodlarını verilən (məs. sessiya) hovuzuna köçür"""
+        if pool is self.pool:
+            return self
+        lookup = pool.encode(self.pool.array())
+        directions = {
+            direction: DirectionData(
+                times=data.times,
+                order=data.order,
+                names=lookup[data.names],
+                borders=lookup[data.borders]
+            )
+            for direction, data in self.directions.items()
+        }
+        dataset = PreparedDataset(directions, pool)
+        dataset.source, dataset.mtime = self.source, self.mtime
+        return dataset
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Keş üçün sütunları lüğət kodlaşdırılmış massivlərə çevir"""
+        strings = self.pool.array()
+        nulls = pd.isna(strings)
+        arrays = {
+            'strings': np.where(nulls, '', strings).astype(str),
+            'string_nulls': nulls
+        }
+        for direction, data in self.directions.items():
+            arrays[f"{direction}/times"] = data.times
+            arrays[f"{direction}/order"] = data.order
+            arrays[f"{direction}/names"] = data.names
+            arrays[f"{direction}/borders"] = data.borders
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, arrays, source: Optional[str] = None) -> 'PreparedDataset':
+        """Keşdəki massivlərdən hazırlanmış verilənləri bərpa et"""
+        strings = arrays['strings'].astype(object)
+        strings[arrays['string_nulls']] = np.nan
+        directions = {
+            direction: DirectionData(
+                times=arrays[f"{direction}/times"],
+                order=arrays[f"{direction}/order"],
+                names=arrays[f"{direction}/names"],
+                borders=arrays[f"{direction}/borders"]
+            )
+            for direction in ['Giriş', 'Çıxış']
+        }
+        return cls(directions, StringPool(strings), source)
+    
+    def __len__(self) -> int:
+        return sum(len(data.times) for data in self.directions.values())
+    
+    def is_stale(self) -> bool:
+        """Fayl hazırlandıqdan sonra dəyişibmi"""
+        if not self.source:
+            return False
+        try:
+            return os.path.getmtime(self.source) != self.mtime
+        except OSError:
+            return True
+
+def is_csv(path: str) -> bool:
+    return path.lower().endswith(('.csv', '.csv.gz'))
+
+def is_parquet(path: str) -> bool:
+    return path.lower().endswith('.parquet')
+
+def require_parquet():
+    """Parquet üçün pyarrow-un quraşdırıldığını yoxla"""
+    if pq is None:
+        raise ImportError("Parquet faylları üçün pyarrow quraşdırılmalıdır")
+
+def read_header(path: str) -> List[str]:
+    """Faylın yalnız başlıq sətrini oxu"""
+    if is_csv(path):
+        return [str(col) for col in pd.read_csv(path, nrows=0).columns]
+    
+    if is_parquet(path):
+        # Sadece dosya şeması okunur
+        require_parquet()
+        return list(pq.read_schema(path).names)
+    
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        # Read-only rejimdə yalnız ilk sətir axınla oxunur
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            return [str(value) for value in header if value is not None]
+        finally:
+            workbook.close()
+    
+    return [str(col) for col in pd.read_excel(path, nrows=0).columns]
+
+def iter_file_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Faylı yalnız tələb olunan sütunlarla, məhdud ölçülü hissələrlə oxu"""
+    if is_csv(path):
+        # Sütun seçimi ve tipler okuma sırasında uygulanır
+        yield from pd.read_csv(
+            path,
+            usecols=REQUIRED_COLUMNS,
+            dtype={col: str for col in REQUIRED_COLUMNS},
+            chunksize=chunk_rows
+        )
+        return
+    
+    if is_parquet(path):
+        require_parquet()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows,
+                                                       columns=REQUIRED_COLUMNS):
+            yield batch.to_pandas()
+        return
+    
+    if not path.lower().endswith(('.xlsx', '.xlsm')):
+        # Köhnə formatlar axınla oxuna bilmir
+        yield pd.read_excel(path, usecols=REQUIRED_COLUMNS)
+        return
+    
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value) for value in next(rows, ())]
+        missing = [col for col in REQUIRED_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"Gerekli sütunlar eksik: {', '.join(missing)}")
+        positions = [header.index(col) for col in REQUIRED_COLUMNS]
+        
+        chunk = []
+        for row in rows:
+            values = [row[pos] if pos < len(row) else None for pos in positions]
+            # Tamamen boş satırları atla
+            if any(value is not None for value in values):
+                chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=REQUIRED_COLUMNS)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=REQUIRED_COLUMNS)
+    finally:
+        workbook.close()
+
+def iter_dataset_chunks(path: str, pool: StringPool,
+                        chunk_rows: int = CHUNK_ROWS) -> Iterator[PreparedDataset]:
+    """Faylı hissə-hissə oxu və hər hissəni verilən hovuzla hazırla"""
+    for chunk in iter_file_chunks(path, chunk_rows):
+        yield PreparedDataset.from_frame(chunk, pool=pool)
+
+def missing_columns(path: str) -> List[str]:
+    """Faylda olmayan tələb olunan sütunları qaytar"""
+    # Geçerli keş varsa dosya zaten doğrulanmıştır
+    if load_cached_dataset(path) is not None:
+        return []
+    
+    header = read_header(path)
+    return [col for col in REQUIRED_COLUMNS if col not in header]
+
+def cache_path_for(path: str) -> str:
+    """Fayl yoluna uyğun keş faylının yolu"""
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.npz")
+
+def file_digest(path: str) -> str:
+    """Faylın məzmun heşi"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_cached_dataset(path: str) -> Optional[PreparedDataset]:
+    """Keşlənmiş verilənləri qaytar; ölçü, mtime və ya məzmun dəyişibsə None"""
+    cache_path = cache_path_for(path)
+    if not os.path.exists(cache_path):
+        return None
+    
+    try:
+        stat = os.stat(path)
+        with np.load(cache_path) as cached:
+            arrays = dict(cached)
+        meta = json.loads(str(arrays.pop('meta')))
+        
+        if meta['version'] != CACHE_VERSION or meta['size'] != stat.st_size:
+            return None
+        
+        dataset = PreparedDataset.from_arrays(arrays, source=path)
+        
+        # Sadece mtime değiştiyse içerik heşi ile doğrula
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            if meta['sha1'] != file_digest(path):
+                return None
+            save_cached_dataset(path, dataset, meta['sha1'])
+        
+        return dataset
+        
+    except Exception:
+        return None  # Bozuk veya okunamayan keş: dosya yeniden okunur
+
+def save_cached_dataset(path: str, dataset: PreparedDataset, digest: Optional[str] = None):
+    """Hazırlanmış verilənləri keş qovluğuna yaz"""
+    try:
+        stat = os.stat(path)
+        meta = {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': digest or file_digest(path)
+        }
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        
+        # Paralel işçiler yarım yazılmış dosya görmesin
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **dataset.to_arrays())
+        os.replace(tmp_path, cache_path_for(path))
+        
+    except Exception:
+        pass  # Keş isteğe bağlıdır; yazılamazsa dosya sonraki seferde yeniden okunur
+
+def known_borders(pool: StringPool, borders: np.ndarray) -> np.ndarray:
+    """Sərhədi məlum olan sətirlərin maskası"""
+    return ~pool.missing()[borders]
+
+def iter_partitions(pool: StringPool, data1: DirectionData, data2: DirectionData,
+                    window: float, cross_border: bool
+                    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Sərhəd və gün üzrə bölmələri (əsas sətirlər, müqayisə sətirləri) qaytar
+
+    Hər bölmə bir-birindən asılı olmadan uyğunlaşdırıla bilər. Müqayisə tərəfi
+    gece yarısı sınırlarında window qədər üst-üstə düşür. cross_border açıq
+    olduqda yalnız gün üzrə bölünür, bağlı olduqda sərhədi boş sətirlər
+    heç bir bölməyə düşmür.
+    """
+    n1 = len(data1.times)
+    valid1 = ~np.isnan(data1.times)
+    if cross_border:
+        borders1 = np.zeros(n1, dtype=np.int64)
+        borders2 = np.zeros(len(data2.times), dtype=np.int64)
+    else:
+        borders1, borders2 = data1.borders, data2.borders
+        valid1 &= known_borders(pool, borders1)
+    
+    # Ana taraf: (sınır, gün) anahtarına göre grupla
+    rows1 = np.flatnonzero(valid1)
+    if not len(rows1):
+        return
+    days1 = (data1.times[rows1] // 86400).astype(np.int64)
+    group_order = np.lexsort((days1, borders1[rows1]))
+    rows1, days1 = rows1[group_order], days1[group_order]
+    group_borders = borders1[rows1]
+    boundaries = np.flatnonzero((np.diff(days1) != 0) | (np.diff(group_borders) != 0)) + 1
+    
+    # Karşılaştırma tarafı: sınır başına zamana göre sıralı satırlar
+    sorted2 = data2.order[:np.count_nonzero(~np.isnan(data2.times))]
+    rows2_by_border = {}
+    
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows1)]):
+        border, day = group_borders[start], days1[start]
+        if border not in rows2_by_border:
+            rows2_by_border[border] = sorted2[borders2[sorted2] == border]
+        rows2 = rows2_by_border[border]
+        times2 = data2.times[rows2]
+        
+        low = np.searchsorted(times2, day * 86400 - window, side='left')
+        high = np.searchsorted(times2, (day + 1) * 86400 + window, side='right')
+        yield rows1[start:end], rows2[low:high]
+
+def partitioned_pairs(pool: StringPool, data1: DirectionData, data2: DirectionData,
+                      window: float, cross_border: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Bölmələri ayrıca uyğunlaşdır və nəticələri birləşdir"""
+    parts1, parts2 = [np.array([], dtype=np.int64)], [np.array([], dtype=np.int64)]
+    for rows1, rows2 in iter_partitions(pool, data1, data2, window, cross_border):
+        idx1, idx2 = sweep_pairs(data1.times[rows1], data2.times[rows2], window)
+        parts1.append(rows1[idx1])
+        parts2.append(rows2[idx2])
+    
+    idx1, idx2 = np.concatenate(parts1), np.concatenate(parts2)
+    order = np.lexsort((idx2, idx1))
+    return idx1[order], idx2[order]
+
+def different_people(pool: StringPool, names1: np.ndarray, names2: np.ndarray,
+                     options: MatchOptions) -> np.ndarray:
+    """Cütlərin fərqli şəxslərə aid olub-olmadığı maskası"""
+    if options.fuzzy_names:
+        identities = pool.identities()
+        return identities[names1] != identities[names2]
+    return names1 != names2
+
+def match_indices(main: PreparedDataset, comp: PreparedDataset, direction: str,
+                  options: MatchOptions) -> Tuple[np.ndarray, np.ndarray]:
+    """Uyğun gələn (əsas, müqayisə) sətir indekslərini tap
+
+    Hər iki fayl eyni hovuzla kodlanmalıdır; adlar tam ədəd kimi müqayisə olunur.
+    """
+    data1 = main.directions[direction]
+    data2 = comp.directions[direction]
+    window = options.max_time * 60
+    
+    if options.partitioned:
+        idx1, idx2 = partitioned_pairs(main.pool, data1, data2, window, options.cross_border)
+    else:
+        # Zamana göre sıralı tarafta max_time penceresini kaydır
+        idx1, idx2 = sweep_pairs(data1.times, data2.times, window, data2.order)
+    return filter_pairs(main.pool, data1, data2, idx1, idx2, options)
+
+def filter_pairs(pool: StringPool, data1: DirectionData, data2: DirectionData,
+                 idx1: np.ndarray, idx2: np.ndarray,
+                 options: MatchOptions) -> Tuple[np.ndarray, np.ndarray]:
+    """Pəncərə cütlərindən sərhədi uyğun gəlməyənləri və eyni şəxsləri at"""
+    if not options.cross_border:
+        same_border = ((data1.borders[idx1] == data2.borders[idx2]) &
+                       known_borders(pool, data1.borders[idx1]))
+        idx1, idx2 = idx1[same_border], idx2[same_border]
+    
+    # Farklı kişiler olmalı
+    different = different_people(pool, data1.names[idx1], data2.names[idx2], options)
+    return idx1[different], idx2[different]
+
+def iter_pair_blocks(main: PreparedDataset, comp: PreparedDataset, direction: str,
+                     options: MatchOptions,
+                     block_rows: int = PAIR_BLOCK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Uyğun indeks cütlərini məhdud bloklarla qaytar
+
+    partitioned açıq olduqda hər sərhəd/gün bölməsi ayrıca blokdur, əks halda
+    əsas tərəf block_rows sətirlik aralıqlara bölünür və hər aralıq bütün
+    müqayisə tərəfi ilə ayrıca süpürülür.
+    """
+    data1 = main.directions[direction]
+    data2 = comp.directions[direction]
+    window = options.max_time * 60
+    
+    if options.partitioned:
+        for rows1, rows2 in iter_partitions(main.pool, data1, data2, window, options.cross_border):
+            idx1, idx2 = sweep_pairs(data1.times[rows1], data2.times[rows2], window)
+            yield filter_pairs(main.pool, data1, data2, rows1[idx1], rows2[idx2], options)
+        return
+    
+    for start in range(0, len(data1.times), block_rows):
+        idx1, idx2 = sweep_pairs(data1.times[start:start + block_rows], data2.times,
+                                 window, data2.order)
+        yield filter_pairs(main.pool, data1, data2, idx1 + start, idx2, options)
+
+def iter_self_blocks(main: PreparedDataset, direction: str, options: MatchOptions,
+                     block_rows: int = PAIR_BLOCK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Faylın öz cütlərini məhdud bloklarla qaytar (A həmişə kiçik kodlu şəxsdir)"""
+    data = main.directions[direction]
+    for idx1, idx2 in iter_self_pairs(data.times, options.max_time * 60, data.order, block_rows):
+        idx1, idx2 = filter_pairs(main.pool, data, data, idx1, idx2, options)
+        
+        # Giriş ve çıkışta aynı yön olsun diye A her zaman küçük kodlu kişidir
+        swap = data.names[idx1] > data.names[idx2]
+        yield np.where(swap, idx2, idx1), np.where(swap, idx1, idx2)
+
+def add_counts(counts: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Kod saylarını artır (massiv lazım olduqda böyüdülür)"""
+    added = np.bincount(codes, minlength=len(counts))
+    return np.pad(counts, (0, len(added) - len(counts))) + added
+
+def select_top_k(main: PreparedDataset, blocks: Callable[[], Iterable[Tuple]],
+                 top_k: int) -> Dict[str, MatchStore]:
+    """Cüt bloklarından hər istiqamətdə ən şübhəli top_k cütü saxla
+
+    blocks hər çağırışda (istiqamət, müqayisə dataseti, idx1, idx2, sıra
+    açarı) bloklarını yenidən yaratmalıdır. Birinci keçiddə hər şəxsin
+    uyğunluq sayı hesablanır, ikinci keçiddə bloklar həmin saylarla
+    sıralanıb məhdud buferə əlavə olunur; yaddaş top_k + bir blok qədərdir.
+    """
+    directions = ['Giriş', 'Çıxış']
+    counts = {direction: np.zeros(0, dtype=np.int64) for direction in directions}
+    
+    # 1. keçid: şəxs başına uyğunluq sayları
+    for direction, comp, idx1, idx2, _ in blocks():
+        counts[direction] = add_counts(counts[direction], main.directions[direction].names[idx1])
+        counts[direction] = add_counts(counts[direction], comp.directions[direction].names[idx2])
+    
+    # 2. keçid: ən yaxşı top_k cütü saxlayan bufer
+    kept = {direction: MatchStore.empty() for direction in directions}
+    keys = {direction: [np.array([], dtype=np.int64)] * 3 for direction in directions}
+    
+    for direction, comp, idx1, idx2, order_key in blocks():
+        if not len(idx1):
+            continue
+        block = build_matches(main, comp, direction, idx1, idx2)
+        score = counts[direction][block.person_a] + counts[direction][block.person_b]
+        store = MatchStore.concat([kept[direction], block])
+        score, key1, key2 = (
+            np.concatenate([old, new]) for old, new in
+            zip(keys[direction], [score, idx1, order_key])
+        )
+        
+        if len(store) > top_k:
+            best = np.lexsort((key2, key1, store.time_diff, -score))[:top_k]
+            store = store.take(best)
+            score, key1, key2 = score[best], key1[best], key2[best]
+        kept[direction], keys[direction] = store, [score, key1, key2]
+    
+    # Saxlanılan cütləri adi uyğunlaşdırma sırasına qaytar
+    stores = {}
+    for direction in directions:
+        _, key1, key2 = keys[direction]
+        stores[direction] = kept[direction].take(np.lexsort((key2, key1)))
+    
+    return {'entry': stores['Giriş'], 'exit': stores['Çıxış']}
+
+def match_top_k(main: PreparedDataset, chunks: Callable[[], Iterable[PreparedDataset]],
+                options: MatchOptions) -> Dict[str, MatchStore]:
+    """Müqayisə faylının hər istiqamətdə yalnız ən şübhəli top_k cütünü saxla
+
+    Cütlər iter_pair_blocks ilə məhdud bloklarla yaradılır, ona görə yaddaş
+    top_k + bir blok qədərdir; chunks hər çağırışda faylı yenidən oxumalıdır
+    (axınla oxunan fayl iki dəfə oxunur).
+    
+    Saylar yalnız bu müqayisə faylı üzrədir: nəticə, faylın bütün
+    uyğunluqlarını MatchStore.top ilə sıralamaqla eynidir. Bir neçə faylda
+    hər faylın top_k cütü birləşdirilib yenidən top ilə kəsilir, ona görə
+    ümumi sıralama saxlanılan cütlərin sayları ilə aparılır.
+    """
+    def blocks():
+        offsets = {'Giriş': 0, 'Çıxış': 0}
+        for chunk in chunks():
+            for direction in ['Giriş', 'Çıxış']:
+                for idx1, idx2 in iter_pair_blocks(main, chunk, direction, options):
+                    yield direction, chunk, idx1, idx2, idx2 + offsets[direction]
+                offsets[direction] += len(chunk.directions[direction].times)
+    
+    return select_top_k(main, blocks, options.top_k)
+
+def build_matches(main: PreparedDataset, comp: PreparedDataset, direction: str,
+                  idx1: np.ndarray, idx2: np.ndarray) -> MatchStore:
+    """İndeks cütlərindən uyğunluq mağazası yarat"""
+    data1 = main.directions[direction]
+    data2 = comp.directions[direction]
+    times1, times2 = data1.times[idx1], data2.times[idx2]
+    
+    return MatchStore(
+        pool=main.pool,
+        person_a=data1.names[idx1],
+        person_b=data2.names[idx2],
+        border=data1.borders[idx1],
+        time_a=(times1 // 60).astype(np.int64),
+        time_b=(times2 // 60).astype(np.int64),
+        time_diff=(np.abs(times1 - times2) / 60).astype(np.int32)
+    )
+
+def match_datasets(main: PreparedDataset, comp: PreparedDataset, direction: str,
+                   options: MatchOptions) -> MatchStore:
+    """Giriş və ya çıxış uyğunluqlarını tap"""
+    idx1, idx2 = match_indices(main, comp, direction, options)
+    return build_matches(main, comp, direction, idx1, idx2)
+
+def match_stream(main: PreparedDataset, chunks: Iterator[PreparedDataset],
+                 options: MatchOptions,
+                 progress: Optional['AnalysisProgress'] = None) -> Dict[str, MatchStore]:
+    """Müqayisə faylını hissə-hissə uyğunlaşdır
+
+    Hər hissə əsas faylla ayrıca uyğunlaşdırılıb atılır, ona görə yaddaş
+    faylın ölçüsündən asılı olmur. Pəncərə əsas tərəfdə axtarıldığı üçün
+    hissələrin zaman sırası ilə gəlməsi tələb olunmur. progress verilərsə
+    hər hissənin uyğunluqları dərhal partiya kimi göndərilir.
+    """
+    categories = {'Giriş': 'entry', 'Çıxış': 'exit'}
+    results = {'Giriş': [], 'Çıxış': []}
+    sort_keys = {'Giriş': [], 'Çıxış': []}
+    offsets = {'Giriş': 0, 'Çıxış': 0}
+    
+    for chunk in chunks:
+        for direction in ['Giriş', 'Çıxış']:
+            idx1, idx2 = match_indices(main, chunk, direction, options)
+            results[direction].append(build_matches(main, chunk, direction, idx1, idx2))
+            if progress is not None:
+                progress.emit(categories[direction], results[direction][-1])
+            sort_keys[direction].append((idx1, idx2 + offsets[direction]))
+            offsets[direction] += len(chunk.directions[direction].times)
+    
+    # Tam dosya ile aynı sırayı geri kur
+    stores = {}
+    for direction, keys in sort_keys.items():
+        stores[direction] = MatchStore.concat(results[direction])
+        if keys:
+            idx1 = np.concatenate([k[0] for k in keys])
+            idx2 = np.concatenate([k[1] for k in keys])
+            stores[direction] = stores[direction].take(np.lexsort((idx2, idx1)))
+    
+    return {'entry': stores['Giriş'], 'exit': stores['Çıxış']}
+
+def match_complete(entry_matches: MatchStore, exit_matches: MatchStore) -> MatchStore:
+    """Tam uyğunluqları tap
+
+    Çıxışlar (şəxs A, şəxs B, sərhəd) açarı ilə hash join vasitəsilə girişlərə
+    birləşdirilir; hər cüt+gün kombinasiyasından ilk uyğunluq saxlanılır.
+    """
+    if not len(entry_matches) or not len(exit_matches):
+        return MatchStore.empty(complete=True)
+    
+    exit_matches = exit_matches.intern(entry_matches.pool)
+    
+    def frame(store, index_name):
+        return pd.DataFrame({
+            'person_a': store.person_a,
+            'person_b': store.person_b,
+            'border': store.border,
+            'time': store.time_a,
+            index_name: np.arange(len(store))
+        })
+    
+    entries = frame(entry_matches, 'entry')
+    exits = frame(exit_matches, 'exit')
+    
+    # Aynı kişiler ve sınır noktası, çıkış girişten sonra
+    pairs = entries.merge(exits, on=['person_a', 'person_b', 'border'], suffixes=('_entry', '_exit'))
+    pairs = pairs[pairs['time_exit'] > pairs['time_entry']]
+    
+    # Eski döngü sırasıyla her (kişiler, giriş günü, çıkış günü) için ilkini tut
+    pairs = pairs.sort_values(['entry', 'exit'], kind='stable')
+    pairs = pairs.assign(day_entry=pairs['time_entry'] // 1440, day_exit=pairs['time_exit'] // 1440)
+    pairs = pairs.drop_duplicates(['person_a', 'person_b', 'day_entry', 'day_exit'])
+    
+    entry_idx = pairs['entry'].to_numpy()
+    exit_idx = pairs['exit'].to_numpy()
+    
+    return MatchStore(
+        pool=entry_matches.pool,
+        person_a=pairs['person_a'].to_numpy(dtype=np.int32),
+        person_b=pairs['person_b'].to_numpy(dtype=np.int32),
+        border=pairs['border'].to_numpy(dtype=np.int32),
+        time_a=entry_matches.time_a[entry_idx],
+        time_b=entry_matches.time_b[entry_idx],
+        time_diff=entry_matches.time_diff[entry_idx],
+        exit_time_a=exit_matches.time_a[exit_idx],
+        exit_time_b=exit_matches.time_b[exit_idx],
+        exit_diff=exit_matches.time_diff[exit_idx]
+    )
+
+def match_self(main: PreparedDataset, direction: str, options: MatchOptions) -> MatchStore:
+    """Faylı özü ilə uyğunlaşdır (hər yoldaş cütü bir dəfə)"""
+    parts1, parts2 = [np.array([], dtype=np.int64)], [np.array([], dtype=np.int64)]
+    for idx1, idx2 in iter_self_blocks(main, direction, options):
+        parts1.append(idx1)
+        parts2.append(idx2)
+    
+    idx1, idx2 = np.concatenate(parts1), np.concatenate(parts2)
+    order = np.lexsort((idx2, idx1))
+    return build_matches(main, main, direction, idx1[order], idx2[order])
+
+def match_self_top_k(main: PreparedDataset, options: MatchOptions) -> Dict[str, MatchStore]:
+    """Faylın öz uyğunluqlarından hər istiqamətdə ən şübhəli top_k cütü saxla
+
+    Nəticə match_self(...).top(top_k) ilə eynidir, amma bütün cütlər heç
+    vaxt birlikdə yaradılmır.
+    """
+    def blocks():
+        for direction in ['Giriş', 'Çıxış']:
+            for idx1, idx2 in iter_self_blocks(main, direction, options):
+                yield direction, main, idx1, idx2, idx2
+    
+    return select_top_k(main, blocks, options.top_k)
+
+class AnalysisCancelled(Exception):
+    """Analiz istifadəçi tərəfindən dayandırıldı"""
+
+class AnalysisProgress:
+    """Fon analizinin gedişatı və dayandırma bayrağı
+
+    İşçi axın sayğacları artırır, UI onları root.after ilə oxuyur. add()
+    hər hissə sərhədində çağırılır və dayandırma istənibsə
+    AnalysisCancelled qaldırır. emit() hazır olan uyğunluq partiyalarını
+    (kateqoriya, mağaza) növbəyə qoyur ki, cədvəllər analiz bitmədən dolsun.
+    İşçi nəticələri sessiyaya yazmır: main, results_key və results (konvoy
+    axtarışında convoys) burada toplanır və iş bitəndə UI axınında köçürülür.
+    """
+    
+    def __init__(self, total_files: int = 0, cached: Optional[Dict] = None,
+                 cached_key: Optional[Tuple] = None):
+        self.total_files = total_files
+        self.files = 0
+        self.rows = 0
+        self.matches = 0
+        self.errors: List[Tuple[str, str]] = []
+        self.error: Optional[Exception] = None
+        self.stop_event = threading.Event()
+        self.batches = deque()
+        self.cached = dict(cached or {})
+        self.cached_key = cached_key
+        self.thread: Optional[threading.Thread] = None
+        self.main: Optional['PreparedDataset'] = None
+        self.convoys: Optional[List['Convoy']] = None
+        self.results_key: Optional[Tuple] = None
+        self.results: Dict[str, Dict[str, MatchStore]] = {}
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+    
+    def cancel(self):
+        self.stop_event.set()
+    
+    def add(self, files: int = 0, rows: int = 0, matches: int = 0):
+        """Sayğacları artır və dayandırma istənibsə analizi kəs"""
+        self.files += files
+        self.rows += rows
+        self.matches += matches
+        if self.cancelled:
+            raise AnalysisCancelled()
+    
+    def emit(self, category: str, matches: MatchStore):
+        """Uyğunluq partiyasını UI üçün növbəyə əlavə et"""
+        if len(matches):
+            self.batches.append((category, matches))
+
+def track_chunks(chunks: Iterable[PreparedDataset],
+                 progress: Optional[AnalysisProgress]) -> Iterator[PreparedDataset]:
+    """Hissələri oxunduqca gedişata yaz (hər hissədən əvvəl dayandırma yoxlanır)"""
+    for chunk in chunks:
+        if progress is not None:
+            progress.add(rows=len(chunk))
+        yield chunk
+
+class ChunkSpool:
+    """Axınla oxunan faylın hazırlanmış hissələrini müvəqqəti fayllara yazan köməkçi
+
+    Hər hissənin zaman və kod sütunları (oxuyan hovuzun kodları) xam
+    fayllara əlavə olunur, yaddaşda yalnız cari hissə qalır. finish()-dən
+    sonra replay() hissələri fayl yenidən oxunmadan qaytarır, save() isə
+    npz keşini memmap sütunlarından qurur: kodlar hissə-hissə sıxlaşdırılır,
+    tam ölçüdə yalnız zaman və sıralama massivləri yaranır.
+    """
+    
+    DIRECTIONS = ['Giriş', 'Çıxış']
+    FIELDS = {'times': np.float64, 'names': np.int32, 'borders': np.int32}
+    
+    def __init__(self, path: str, pool: StringPool):
+        self.path = path
+        self.pool = pool
+        self.sizes: List[Dict[str, int]] = []   # Hissə başına istiqamət sətir sayları
+        self.used = np.zeros(0, dtype=bool)     # Hissələrdə rast gəlinən hovuz kodları
+        self.complete = False
+        self.directory = tempfile.mkdtemp(prefix=SPILL_PREFIX)
+        self.files = {
+            (direction, field): open(os.path.join(self.directory, f"{number}_{field}"), 'wb')
+            for number, direction in enumerate(self.DIRECTIONS) for field in self.FIELDS
+        }
+    
+    def add(self, chunk: PreparedDataset):
+        """Hissənin sütunlarını fayllara əlavə et"""
+        for direction in self.DIRECTIONS:
+            data = chunk.directions[direction]
+            for field, dtype in self.FIELDS.items():
+                self.files[direction, field].write(np.asarray(getattr(data, field), dtype=dtype).tobytes())
+            self.used = np.pad(self.used, (0, max(0, len(self.pool) - len(self.used))))
+            self.used[data.names] = True
+            self.used[data.borders] = True
+        self.sizes.append({direction: len(chunk.directions[direction].times)
+                           for direction in self.DIRECTIONS})
+    
+    def finish(self):
+        """Fayl tam oxundu: yazmanı bitir"""
+        for handle in self.files.values():
+            handle.close()
+        self.complete = True
+    
+    def column(self, direction: str, field: str) -> np.ndarray:
+        """Yazılmış sütunu memmap kimi aç"""
+        dtype = self.FIELDS[field]
+        filename = self.files[direction, field].name
+        if not os.path.getsize(filename):
+            return np.array([], dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode='r')
+    
+    def replay(self) -> Iterator[PreparedDataset]:
+        """Hissələri yazıldıqları sıra ilə yenidən qaytar"""
+        columns = {key: self.column(*key) for key in self.files}
+        starts = {direction: 0 for direction in self.DIRECTIONS}
+        for sizes in self.sizes:
+            directions = {}
+            for direction in self.DIRECTIONS:
+                rows = slice(starts[direction], starts[direction] + sizes[direction])
+                starts[direction] = rows.stop
+                times = np.array(columns[direction, 'times'][rows])
+                directions[direction] = DirectionData(
+                    times=times,
+                    order=np.argsort(times, kind='stable'),
+                    names=np.array(columns[direction, 'names'][rows]),
+                    borders=np.array(columns[direction, 'borders'][rows])
+                )
+            yield PreparedDataset(directions, self.pool)
+    
+    def save(self):
+        """Yazılmış hissələrdən faylın keşini qur (yalnız istifadə olunan dəyərlərlə)"""
+        used = np.flatnonzero(self.used)
+        lookup = np.zeros(len(self.used), dtype=np.int32)
+        lookup[used] = np.arange(len(used), dtype=np.int32)
+        
+        directions = {}
+        for number, direction in enumerate(self.DIRECTIONS):
+            times = self.column(direction, 'times')
+            fields = {}
+            for field in ['names', 'borders']:
+                codes = self.column(direction, field)
+                if not len(codes):
+                    fields[field] = codes
+                    continue
+                compact = np.memmap(os.path.join(self.directory, f"{number}_{field}_compact"),
+                                    dtype=np.int32, mode='w+', shape=(len(codes),))
+                for start in range(0, len(codes), CHUNK_ROWS):
+                    compact[start:start + CHUNK_ROWS] = lookup[codes[start:start + CHUNK_ROWS]]
+                fields[field] = compact
+            directions[direction] = DirectionData(
+                times=times, order=np.argsort(times, kind='stable'), **fields
+            )
+        save_cached_dataset(self.path, PreparedDataset(directions, StringPool(self.pool.array()[used])))
+    
+    def close(self):
+        """Müvəqqəti faylları sil"""
+        for handle in self.files.values():
+            handle.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def iter_cached_chunks(path: str, pool: StringPool, progress: Optional[AnalysisProgress],
+                       spool: Optional[ChunkSpool] = None) -> Iterator[PreparedDataset]:
+    """Faylı hissə-hissə oxu, hamısı oxunduqda hazırlanmış hissələri keşə yaz
+
+    Hissələr ChunkSpool ilə diskə əlavə olunur, ona görə yaddaşda yalnız cari
+    hissə saxlanılır. spool verilərsə (top_k-nın ikinci keçidi üçün) onu
+    çağıran bağlayır. Analiz dayandırılarsa keş yazılmır.
+    """
+    owned = spool is None
+    if owned:
+        spool = ChunkSpool(path, pool)
+    try:
+        for chunk in track_chunks(iter_dataset_chunks(path, pool), progress):
+            spool.add(chunk)
+            yield chunk
+        spool.finish()
+        spool.save()
+    finally:
+        if owned:
+            spool.close()
+
+def enforce_memory_budget(file_results: Dict[str, Dict[str, MatchStore]],
+                          budget: Optional[int], spill_dir: Optional[str]):
+    """Yaddaşdakı fayl nəticələri limiti aşırsa onları spill_dir qovluğuna köçür"""
+    if budget is None:
+        return
+    
+    resident = sum(
+        store.nbytes for results in file_results.values()
+        for store in results.values() if not store.is_spilled
+    )
+    if resident <= budget:
+        return
+    
+    for comp_file, results in file_results.items():
+        file_results[comp_file] = {
+            category: store.spill(spill_dir) for category, store in results.items()
+        }
+
+def analyze_self(main: PreparedDataset, options: MatchOptions,
+                 progress: Optional[AnalysisProgress] = None) -> Dict[str, MatchStore]:
+    """Əsas faylın öz içindəki uyğunluqlarını tap"""
+    rows = len(main.directions['Giriş'].times) + len(main.directions['Çıxış'].times)
+    if options.top_k:
+        results = match_self_top_k(main, options)
+        entry_matches, exit_matches = results['entry'], results['exit']
+        if progress is not None:
+            progress.emit('entry', entry_matches)
+            progress.emit('exit', exit_matches)
+            progress.add(rows=rows)
+    else:
+        entry_matches = match_self(main, 'Giriş', options)
+        if progress is not None:
+            progress.emit('entry', entry_matches)
+            progress.add(rows=len(main.directions['Giriş'].times))
+        exit_matches = match_self(main, 'Çıxış', options)
+        if progress is not None:
+            progress.emit('exit', exit_matches)
+            progress.add(rows=len(main.directions['Çıxış'].times))
+    
+    return {
+        'entry': entry_matches,
+        'exit': exit_matches,
+        'complete': match_complete(entry_matches, exit_matches)
+    }
+
+@dataclass
+class Convoy:
+    """Bir neçə gün birlikdə keçən şəxslər qrupu"""
+    members: List[str]
+    days: int             # Ən azı CONVOY_MIN_SIZE üzvün eyni pəncərədə keçdiyi gün sayı
+    borders: List[str]
+    last_seen: str
+
+def detect_convoys(datasets: List[PreparedDataset], max_time: int, min_days: int = 2,
+                   min_size: int = CONVOY_MIN_SIZE,
+                   max_window: int = CONVOY_MAX_WINDOW) -> List[Convoy]:
+    """Eyni məntəqədən max_time daxilində bir neçə gün birlikdə keçən qrupları tap
+
+    Keçidlər istiqamət/məntəqə üzrə eni max_time olan, CONVOY_PHASES addımla
+    sürüşdürülmüş pəncərələrə bölünür (hər keçid CONVOY_PHASES pəncərəyə
+    düşür). Pəncərədə ən azı min_days gün birlikdə olan şəxslər union-find
+    ilə qruplaşdırılır, sonra hər qrupun ən azı min_size üzvünün eyni
+    pəncərədə olduğu günlər sayılır. İzdihamlı pəncərələr atılmır: orada hər
+    şəxs zamanca özündən sonrakı ən çox max_window - 1 şəxslə cütləşir, ona
+    görə cüt sayı pəncərə ölçüsü ilə xətti artır. Bütün verilənlər eyni
+    hovuzla kodlanmalıdır.
+    """
+    pool = datasets[0].pool
+    parts = [(data, code) for dataset in datasets
+             for code, data in enumerate(dataset.directions.values())]
+    crossings = pd.DataFrame({
+        'direction': np.concatenate([np.full(len(data.times), code) for data, code in parts]),
+        'border': np.concatenate([data.borders for data, _ in parts]),
+        'name': np.concatenate([data.names for data, _ in parts]),
+        'time': np.concatenate([data.times for data, _ in parts])
+    }).dropna(subset=['time'])
+    if crossings.empty:
+        return []
+    
+    # Sürüşdürülmüş pəncərələr: eni max_time-ın 3/4-ünü aşmayan qrup ən azı birinə tam düşür
+    tiles = (crossings['time'] // (max_time * 60 / CONVOY_PHASES)).astype(np.int64)
+    windows = pd.concat([
+        crossings.assign(phase=phase, slot=(tiles - phase) // CONVOY_PHASES)
+        for phase in range(CONVOY_PHASES)
+    ], ignore_index=True)
+    
+    # Pəncərə başına unikal şəxslər və onların ilk keçid zamanı
+    window_keys = ['direction', 'border', 'phase', 'slot']
+    members = windows.groupby(window_keys + ['name'], sort=True)['time'].min().reset_index()
+    members['window'] = members.groupby(window_keys, sort=True).ngroup()
+    sizes = members.groupby('window')['name'].transform('size')
+    members = members[sizes >= min_size].sort_values(['window', 'time'], kind='stable')
+    if members.empty:
+        return []
+    
+    # Pəncərədə zamanca yaxın cütlər; gün cütün öz keçidlərindən götürülür
+    member_windows = members['window'].to_numpy()
+    member_names = members['name'].to_numpy()
+    member_times = members['time'].to_numpy()
+    
+    group_end = np.searchsorted(member_windows, member_windows, side='right')
+    positions = np.arange(len(member_windows))
+    counts = np.minimum(group_end - positions - 1, max_window - 1)
+    first = np.repeat(positions, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + offsets
+    
+    pair_days = pd.DataFrame({
+        'a': member_names[first],
+        'b': member_names[second],
+        'day': np.minimum(member_times[first], member_times[second]) // 86400
+    }).drop_duplicates()
+    day_counts = pair_days.groupby(['a', 'b']).size()
+    repeated = day_counts[day_counts >= min_days].index
+    
+    # Tekrarlanan çiftleri union-find ile grupla
+    parent: Dict[int, int] = {}
+    
+    def find(person: int) -> int:
+        parent.setdefault(person, person)
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+    
+    for a, b in repeated:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    
+    if not parent:
+        return []
+    
+    # Grubun en az min_size üyesinin aynı pencerede olduğu günleri say
+    group_of = np.full(len(pool), -1, dtype=np.int64)
+    for person in list(parent):
+        group_of[person] = find(person)
+    
+    grouped = members.assign(group=group_of[member_names])
+    grouped = grouped[grouped['group'] >= 0]
+    together = grouped.groupby(['group', 'window']).agg(
+        size=('name', 'size'), time=('time', 'min'), border=('border', 'first')
+    ).reset_index()
+    together = together[together['size'] >= min_size].sort_values(['group', 'time'])
+    
+    # Gecə yarısını keçən eyni keçid iki gün sayılmasın: yaxın pəncərələr bir hadisədir
+    group_codes = together['group'].to_numpy()
+    times = together['time'].to_numpy()
+    new_event = np.ones(len(times), dtype=bool)
+    new_event[1:] = (group_codes[1:] != group_codes[:-1]) | (np.diff(times) > max_time * 60)
+    events = np.cumsum(new_event)
+    together['day'] = together.groupby(events)['time'].transform('min') // 86400
+    
+    strings = pool.array()
+    convoys = []
+    for group, rows in together.groupby('group'):
+        days = rows['day'].nunique()
+        if days < min_days:
+            continue
+        convoys.append(Convoy(
+            members=sorted(strings[np.flatnonzero(group_of == group)].tolist(), key=str),
+            days=int(days),
+            borders=sorted({str(strings[border]) for border in rows['border']}),
+            last_seen=format_minutes(int(rows['day'].max()) * 1440, '%d.%m.%Y')
+        ))
+    
+    convoys.sort(key=lambda convoy: (-convoy.days, -len(convoy.members)))
+    return convoys
+
+def analyze_comparison_file(main: PreparedDataset, comp_file: str, options: MatchOptions,
+                            progress: Optional[AnalysisProgress] = None) -> Dict[str, MatchStore]:
+    """Bir müqayisə faylını oxu və əsas fayl ilə uyğunlaşdır
+
+    Proses hovuzunda işləyə bilməsi üçün modul səviyyəsindədir. progress
+    verilərsə (yalnız eyni prosesdə) hər hissədən sonra gedişat yazılır və
+    dayandırma yoxlanır.
+    """
+    comp = load_cached_dataset(comp_file)
+    streaming = comp is None and os.path.getsize(comp_file) >= STREAM_MIN_BYTES
+    
+    if options.top_k:
+        # Yoğun geçişlerde sadece en şüpheli çiftler bellekte tutulur
+        spool = None
+        if streaming:
+            # İkinci geçiş dosyayı yeniden okumaz, diske yazılan parçaları kullanır
+            spool = ChunkSpool(comp_file, main.pool)
+            chunks = lambda: (spool.replay() if spool.complete else
+                              iter_cached_chunks(comp_file, main.pool, progress, spool))
+        else:
+            if comp is None:
+                comp = PreparedDataset.from_file(comp_file)
+            comp = comp.intern(main.pool)
+            chunks = lambda: track_chunks([comp], progress)
+        try:
+            best = match_top_k(main, chunks, options)
+        finally:
+            if spool is not None:
+                spool.close()
+        entry_matches, exit_matches = best['entry'], best['exit']
+        if progress is not None:
+            progress.emit('entry', entry_matches)
+            progress.emit('exit', exit_matches)
+    elif streaming:
+        # Büyük dosyalar DataFrame olarak bellekte tutulmadan parça parça eşleştirilir
+        streamed = match_stream(
+            main, iter_cached_chunks(comp_file, main.pool, progress), options, progress
+        )
+        entry_matches, exit_matches = streamed['entry'], streamed['exit']
+    else:
+        if comp is None:
+            comp = PreparedDataset.from_file(comp_file)
+        
+        # İsimler ana dosyayla aynı kodlarla karşılaştırılır
+        comp = comp.intern(main.pool)
+        if progress is not None:
+            progress.add(rows=len(comp))
+        
+        entry_matches = match_datasets(main, comp, 'Giriş', options)
+        if progress is not None:
+            progress.emit('entry', entry_matches)
+            progress.add()
+        exit_matches = match_datasets(main, comp, 'Çıxış', options)
+        if progress is not None:
+            progress.emit('exit', exit_matches)
+    
+    return {
+        'entry': entry_matches,
+        'exit': exit_matches,
+        'complete': match_complete(entry_matches, exit_matches)
+    }
+
+# Nəticə cədvəlinin sütunları: (ad, başlıq, en)
+RESULT_COLUMNS = [
+    ("Şəxs A", "Şəxs A (Sayı)", 200),
+    ("Şəxs B", "Şəxs B (Sayı)", 200),
+    ("Tarix", "Tarix", 150),
+    ("Saat", "Saat", 150),
+    ("Vaxt Fərqi", "Vaxt Fərqi", 100),
+    ("Sərhəd Məntəqəsi", "Sərhəd Məntəqəsi", 200),
+    ("Təkrar", "Təkrar", 80),
+    ("Birgə Dövr", "Birgə Dövr", 260)
+]
+
+class VirtualTable(ctk.CTkFrame):
+    """Yalnız görünən sətirləri çəkən nəticə cədvəli
+
+    Görünüş sahəsinə sığan qədər sabit sətir vidceti yaradılır; sürüşdürmədə
+    vidcetlər yaradılmır, yalnız yeni indekslərin məlumatı ilə yenilənir.
+    cell_values(matches, index) sütun adı -> mətn lüğəti, row_color(matches,
+    index) isə sətir rəngini qaytarır.
+    """
+    
+    ROW_HEIGHT = 38  # Satır yüksekliği (pady dahil), piksel
+    
+    def __init__(self, master, cell_values: Callable, row_color: Callable, **kwargs):
+        super().__init__(master, **kwargs)
+        self.cell_values = cell_values
+        self.row_color = row_color
+        self.columns: List[Tuple[str, str, int]] = []
+        self.matches: Optional[MatchStore] = None
+        self.rows = np.array([], dtype=np.int64)
+        self.top = 0
+        self.pool_rows: List[Tuple[ctk.CTkFrame, List[ctk.CTkLabel]]] = []
+        self.total_label: Optional[ctk.CTkLabel] = None
+        
+        self.header = ctk.CTkFrame(self, fg_color="transparent")
+        self.header.pack(fill="x", pady=(0, 10))
+        
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.body.bind("<Configure>", lambda e: self.resize_pool())
+        self.bind_wheel(self.body)
+    
+    def bind_wheel(self, widget):
+        """Siçan təkərini cədvəlin sürüşdürülməsinə bağla"""
+        widget.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-1))  # Linux
+        widget.bind("<Button-5>", lambda e: self.scroll_by(1))
+    
+    def set_columns(self, columns: List[Tuple[str, str, int]], header_color: str):
+        """Sütunları (ad, başlıq, en) və başlıq rəngini təyin et, sətir vidcetlərini yenidən qur"""
+        self.columns = columns
+        self.header.configure(fg_color=header_color)
+        for widget in self.header.winfo_children():
+            widget.destroy()
+        
+        self.total_label = ctk.CTkLabel(
+            self.header,
+            text=f"Ümumi: {len(self.rows)}",
+            font=("Helvetica Bold", 12)
+        )
+        self.total_label.pack(side="right", padx=10, pady=5)
+        
+        for _, title, width in columns:
+            ctk.CTkLabel(
+                self.header,
+                text=title,
+                font=("Helvetica Bold", 12),
+                width=width
+            ).pack(side="left", padx=5, pady=5)
+        
+        # Sütunlar değişince satır havuzu yeniden oluşturulur
+        for row, _ in self.pool_rows:
+            row.destroy()
+        self.pool_rows = []
+        self.resize_pool()
+    
+    def resize_pool(self):
+        """Sətir vidcetlərinin sayını görünüş sahəsinin hündürlüyünə uyğunlaşdır"""
+        needed = max(1, self.body.winfo_height() // self.ROW_HEIGHT)
+        while len(self.pool_rows) < needed:
+            row = ctk.CTkFrame(self.body)
+            labels = []
+            for _, _, width in self.columns:
+                label = ctk.CTkLabel(row, text="", font=("Helvetica", 12), width=width)
+                label.pack(side="left", padx=5, pady=5)
+                self.bind_wheel(label)
+                labels.append(label)
+            self.bind_wheel(row)
+            self.pool_rows.append((row, labels))
+        while len(self.pool_rows) > needed:
+            row, _ = self.pool_rows.pop()
+            row.destroy()
+        self.redraw()
+    
+    def show(self, matches: Optional[MatchStore], rows: np.ndarray, keep_position: bool = False,
+             provisional: bool = False):
+        """Verilən sətir indekslərini (göstəriləcək sıra ilə) cədvələ bağla
+
+        keep_position açıqdırsa sürüşdürmə mövqeyi saxlanılır (canlı əlavələr üçün).
+        provisional açıqdırsa cəm ilkin (analiz bitmədən) kimi göstərilir.
+        """
+        self.matches = matches
+        self.rows = rows
+        if not keep_position:
+            self.top = 0
+        if self.total_label is not None:
+            note = " (ilkin)" if provisional else ""
+            self.total_label.configure(text=f"Ümumi: {len(rows)}{note}")
+        self.redraw()
+    
+    def clear(self):
+        """Cədvəli boşalt"""
+        self.show(None, np.array([], dtype=np.int64))
+    
+    def scroll_to(self, top: int):
+        top = min(max(0, top), max(0, len(self.rows) - len(self.pool_rows)))
+        if top != self.top:
+            self.top = top
+            self.redraw()
+    
+    def scroll_by(self, units: int):
+        self.scroll_to(self.top + units * 3)
+    
+    def on_scrollbar(self, action, value, unit=None):
+        """Sürüşdürmə zolağı əmrləri (moveto / scroll)"""
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.rows)))
+        elif action == "scroll":
+            step = len(self.pool_rows) if unit == "pages" else 1
+            self.scroll_to(self.top + int(value) * step)
+    
+    def redraw(self):
+        """Görünən sətirləri cari sürüşdürmə mövqeyinin məlumatı ilə doldur"""
+        total = len(self.rows)
+        for offset, (row, labels) in enumerate(self.pool_rows):
+            position = self.top + offset
+            if position >= total or self.matches is None:
+                row.pack_forget()
+                continue
+            
+            index = int(self.rows[position])
+            values = self.cell_values(self.matches, index)
+            row.configure(fg_color=self.row_color(self.matches, index))
+            for (name, _, _), label in zip(self.columns, labels):
+                label.configure(text=values.get(name, ""))
+            if not row.winfo_manager():
+                row.pack(fill="x", pady=2)
+        
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(self.pool_rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 class ModernTravelAnalyzer:
     def __init__(self):
@@ -63,14 +2096,54 @@ class ModernTravelAnalyzer:
         
         # Veri değişkenleri
         self.main_file: Optional[str] = None
+        self.main_dataset: Optional[PreparedDataset] = None
+        
+        # Oturum boyunca tüm dosyalar için ortak isim/sınır kodları
+        self.pool = StringPool()
         self.comparison_files: List[str] = []
-        self.match_results: Dict[str, List[MatchResult]] = {
-            'entry': [], 'exit': [], 'complete': []
-        }
+        self.match_results: Dict[str, MatchStore] = empty_results()
+        
+        # Dosya bazında sonuçlar ve hesaplandıkları ayarlar
+        self.file_results: Dict[str, Dict[str, MatchStore]] = {}
+        self.results_key: Optional[Tuple] = None
         
         # Maksimum zaman farkı
         self.max_time = 30
         
+        # Paralel analiz için işçi sayısı
+        self.max_workers = os.cpu_count() or 1
+        
+        # Sınır ve gün bölümlü eşleştirme
+        self.partitioned = False
+        self.cross_border = True
+        
+        # Yoğun geçişler için en iyi K çift (0 = hepsi)
+        self.top_k = 0
+        
+        # İsim varyantlarını (transliterasyon) aynı kişi say
+        self.fuzzy_names = False
+        
+        # Ana dosyayı kendisiyle eşleştir (tek dosyada yol arkadaşları)
+        self.self_match = False
+        
+        # Dosyalar arası tekrarlanan çiftleri at; A/B ve B/A isteğe bağlı birleştirilir
+        self.dedupe_pairs = True
+        self.collapse_symmetric = False
+        
+        # Konvoy: en az bu kadar farklı günde birlikte geçen gruplar
+        self.convoy_min_days = 2
+        
+        # Sonuçlar için bellek limiti (MB, 0 = limitsiz); aşılırsa diske yazılır
+        self.memory_budget_mb = 512
+        
+        # Fon analizi (gedişat və dayandırma); analiz zamanı canlı sayğaclar
+        self.analysis: Optional[AnalysisProgress] = None
+        self.live_counts = {category: 0 for category in ['entry', 'exit', 'complete']}
+        
+        # Gecikmeli arama için bekleyen after kimliği
+        self.search_job = None
+        self.spill_dir: Optional[str] = None
+        
         # Arayüz kurulumu
         self.setup_gui()
         
@@ -140,6 +2213,7 @@ class ModernTravelAnalyzer:
             ("🔄", "Yenilə", self.refresh_data),
             ("📊", "Qrafiklər", self.show_charts),
             ("🕸️", "Şəbəkə", self.show_network_graph),
+            ("👥", "Konvoylar", self.show_convoys),
             ("⚙️", "Parametrlər", self.show_settings),
             ("❓", "Haqqında", self.show_about)
         ]
@@ -206,6 +2280,14 @@ class ModernTravelAnalyzer:
         )
         self.main_file_label.pack(pady=5)
         
+        self.self_match_var = ctk.BooleanVar(value=self.self_match)
+        ctk.CTkCheckBox(
+            section,
+            text="Faylı özü ilə uyğunlaşdır",
+            variable=self.self_match_var,
+            command=self.toggle_self_match
+        ).pack(pady=(0, 10), padx=20, anchor="w")
+        
     def create_comparison_files_section(self, parent):
         """Müqayisə faylları bölməsi"""
         section = ctk.CTkFrame(parent, corner_radius=10, fg_color=self.colors["section_bg"])
@@ -246,6 +2328,18 @@ class ModernTravelAnalyzer:
         )
         self.add_file_btn.pack(fill="x", pady=(0, 5))
         
+        self.remove_btn = ctk.CTkButton(
+            self.comparison_buttons_frame,
+            text="Seçiləni Sil",
+            command=self.remove_comparison_file,
+            fg_color="gray30",
+            hover_color="gray40",
+            state="disabled",
+            height=40,
+            corner_radius=8
+        )
+        self.remove_btn.pack(fill="x", pady=(0, 5))
+        
         self.clear_btn = ctk.CTkButton(
             self.comparison_buttons_frame,
             text="Təmizlə",
@@ -358,14 +2452,17 @@ class ModernTravelAnalyzer:
             )
             self.tab_buttons[key].pack(side="left", padx=5)
         
-        # Sonuç frameleri
+        # Sonuç tabloları (sadece görünen satırlar çizilir)
         self.result_frames = {}
-        for key in ['entry', 'exit', 'complete']:
-            frame = ctk.CTkScrollableFrame(
+        for text, key, color in tabs:
+            frame = VirtualTable(
                 parent,
+                cell_values=self.result_cell_values,
+                row_color=self.result_row_color,
                 fg_color=self.colors["frame_bg"],
                 corner_radius=10
             )
+            frame.set_columns(RESULT_COLUMNS, color)
             self.result_frames[key] = frame
             
         # İlk tabı göster
@@ -387,6 +2484,16 @@ class ModernTravelAnalyzer:
         )
         self.status_label.pack(side="left", padx=10)
         
+        # Analiz ilerlemesi ve iptal (sadece analiz sırasında görünür)
+        self.progress_bar = ctk.CTkProgressBar(self.status_bar, width=200)
+        self.cancel_btn = ctk.CTkButton(
+            self.status_bar,
+            text="Dayandır",
+            width=80,
+            height=24,
+            command=self.cancel_analysis
+        )
+        
         self.time_label = ctk.CTkLabel(
             self.status_bar,
             text=datetime.now().strftime("%H:%M:%S"),
@@ -451,6 +2558,7 @@ class ModernTravelAnalyzer:
         # Tab view oluştur
         tabs = ctk.CTkTabview(chart_window)
         tabs.pack(fill="both", expand=True, padx=10, pady=10)
+        self.chart_tabs = tabs
         
         # Sekmeleri ekle
         tabs.add("Uyğunluq Paylanması")  # Eşleşme Dağılımı
@@ -462,6 +2570,22 @@ class ModernTravelAnalyzer:
         self.create_border_analysis(tabs.tab("Sərhəd Məntəqələri"))
         self.create_time_analysis(tabs.tab("Vaxt Təhlili"))
 
+    def refresh_charts(self):
+        """Açıq qrafik pəncərəsini cari nəticələrlə yenidən çək"""
+        tabs = getattr(self, 'chart_tabs', None)
+        if tabs is None or not tabs.winfo_exists():
+            return
+        
+        charts = {
+            "Uyğunluq Paylanması": self.create_match_distribution,
+            "Sərhəd Məntəqələri": self.create_border_analysis,
+            "Vaxt Təhlili": self.create_time_analysis
+        }
+        for name, create in charts.items():
+            for widget in tabs.tab(name).winfo_children():
+                widget.destroy()
+            create(tabs.tab(name))
+
     def create_match_distribution(self, parent):
         """Uyğunluq paylanması qrafiki"""
         frame = ctk.CTkFrame(parent)
@@ -509,8 +2633,10 @@ class ModernTravelAnalyzer:
         # Sınır noktalarını topla
         border_counts = {}
         for matches in self.match_results.values():
-            for match in matches:
-                border_counts[match.border] = border_counts.get(match.border, 0) + 1
+            counts = np.bincount(matches.border, minlength=len(matches.strings))
+            for code in np.flatnonzero(counts).tolist():
+                border = matches.strings[code]
+                border_counts[border] = border_counts.get(border, 0) + int(counts[code])
         
         # Bar grafiği için canvas
         canvas = self.create_bar_chart(
@@ -535,25 +2661,12 @@ class ModernTravelAnalyzer:
             '26-30 dəq': 0
         }
         
+        # Aralık sınırları: 5, 10, 15, 20, 25 ve üstü
         for matches in self.match_results.values():
-            for match in matches:
-                if isinstance(match.time_diff, int):
-                    time_diff = match.time_diff
-                else:
-                    time_diff = int(match.time_diff.split('/')[0])
-                
-                if time_diff <= 5:
-                    time_ranges['0-5 dəq'] += 1
-                elif time_diff <= 10:
-                    time_ranges['6-10 dəq'] += 1
-                elif time_diff <= 15:
-                    time_ranges['11-15 dəq'] += 1
-                elif time_diff <= 20:
-                    time_ranges['16-20 dəq'] += 1
-                elif time_diff <= 25:
-                    time_ranges['21-25 dəq'] += 1
-                else:
-                    time_ranges['26-30 dəq'] += 1
+            buckets = np.searchsorted([5, 10, 15, 20, 25], matches.time_diff, side='left')
+            counts = np.bincount(buckets, minlength=len(time_ranges))
+            for label, count in zip(time_ranges, counts.tolist()):
+                time_ranges[label] += count
         
         # Line grafiği için canvas
         canvas = self.create_line_chart(
@@ -635,7 +2748,7 @@ class ModernTravelAnalyzer:
         """Parametrlər pəncərəsi"""
         settings_window = ctk.CTkToplevel(self.root)
         settings_window.title("Parametrlər")
-        settings_window.geometry("400x500")
+        settings_window.geometry("400x850")
         
         # Ana çerçeve
         main_frame = ctk.CTkFrame(settings_window)
@@ -654,6 +2767,9 @@ class ModernTravelAnalyzer:
         # Tema ayarları
         self.create_theme_settings(main_frame)
         
+        # Performans ayarları
+        self.create_performance_settings(main_frame)
+        
         # Tablo ayarları
         self.create_table_settings(main_frame)
         
@@ -685,47 +2801,163 @@ class ModernTravelAnalyzer:
             text="Maksimum Vaxt Fərqi:"
         ).pack(side="left")
         
-        self.max_time_var = ctk.StringVar(value="30")
+        self.max_time_var = ctk.StringVar(value=str(self.max_time))
         time_entry = ctk.CTkEntry(
             time_frame,
             textvariable=self.max_time_var,
             width=60
         )
         time_entry.pack(side="right", padx=10)
+        
+        # Konvoy için en az gün sayısı
+        convoy_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        convoy_frame.pack(fill="x", padx=10, pady=(5, 0))
+        
+        ctk.CTkLabel(
+            convoy_frame,
+            text="Konvoy üçün minimum gün sayı:"
+        ).pack(side="left")
+        
+        self.convoy_min_days_var = ctk.StringVar(value=str(self.convoy_min_days))
+        convoy_entry = ctk.CTkEntry(
+            convoy_frame,
+            textvariable=self.convoy_min_days_var,
+            width=60
+        )
+        convoy_entry.pack(side="right", padx=10)
 
-    def create_theme_settings(self, parent):
-        """Temanı dəyişdir"""
+    def create_performance_settings(self, parent):
+        """Performans parametrləri bölməsi"""
         frame = ctk.CTkFrame(parent)
         frame.pack(fill="x", pady=10)
         
         ctk.CTkLabel(
             frame,
-            text="Tema Parametrləri",
+            text="Performans Parametrləri",
             font=("Helvetica Bold", 14)
         ).pack(pady=10)
         
-        # Tema seçimi
-        themes = {
-            "Sistem": "System",
-            "İşıqlı": "Light",
-            "Qaranlıq": "Dark"
-        }
-        
-        self.theme_var = ctk.StringVar(value="Qaranlıq")  # Varsayılan değer
+        # Paralel işçi sayı
+        workers_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        workers_frame.pack(fill="x", padx=10)
         
-        for az_name, eng_name in themes.items():
-            ctk.CTkRadioButton(
-                frame,
-                text=az_name,
-                variable=self.theme_var,
-                value=eng_name,
-                command=self.change_theme
-            ).pack(pady=5)
-
-    def change_theme(self):
-        """Temanı dəyişdir"""
-        selected_theme = self.theme_var.get()
-        ctk.set_appearance_mode(selected_theme)
+        ctk.CTkLabel(
+            workers_frame,
+            text="Paralel İşçi Sayı:"
+        ).pack(side="left")
+        
+        self.max_workers_var = ctk.StringVar(value=str(self.max_workers))
+        workers_entry = ctk.CTkEntry(
+            workers_frame,
+            textvariable=self.max_workers_var,
+            width=60
+        )
+        workers_entry.pack(side="right", padx=10)
+        
+        # Ən şübhəli cütlərin sayı
+        top_k_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        top_k_frame.pack(fill="x", padx=10, pady=(5, 0))
+        
+        ctk.CTkLabel(
+            top_k_frame,
+            text="Ən Yaxşı Cüt Sayı (0 = hamısı):"
+        ).pack(side="left")
+        
+        self.top_k_var = ctk.StringVar(value=str(self.top_k))
+        top_k_entry = ctk.CTkEntry(
+            top_k_frame,
+            textvariable=self.top_k_var,
+            width=80
+        )
+        top_k_entry.pack(side="right", padx=10)
+        
+        # Nəticələr üçün yaddaş limiti
+        budget_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        budget_frame.pack(fill="x", padx=10, pady=(5, 0))
+        
+        ctk.CTkLabel(
+            budget_frame,
+            text="Yaddaş Limiti, MB (0 = limitsiz):"
+        ).pack(side="left")
+        
+        self.memory_budget_var = ctk.StringVar(value=str(self.memory_budget_mb))
+        budget_entry = ctk.CTkEntry(
+            budget_frame,
+            textvariable=self.memory_budget_var,
+            width=80
+        )
+        budget_entry.pack(side="right", padx=10)
+        
+        # Bölümlü eşleştirme seçenekleri
+        self.partitioned_var = ctk.BooleanVar(value=self.partitioned)
+        ctk.CTkCheckBox(
+            frame,
+            text="Sərhəd və gün üzrə bölmələrlə uyğunlaşdır",
+            variable=self.partitioned_var
+        ).pack(pady=2, padx=10, anchor="w")
+        
+        self.cross_border_var = ctk.BooleanVar(value=self.cross_border)
+        ctk.CTkCheckBox(
+            frame,
+            text="Fərqli sərhəd məntəqələri arasında uyğunluqlar",
+            variable=self.cross_border_var
+        ).pack(pady=2, padx=10, anchor="w")
+        
+        self.fuzzy_names_var = ctk.BooleanVar(value=self.fuzzy_names)
+        ctk.CTkCheckBox(
+            frame,
+            text="Ad variantlarını eyni şəxs say (Mammadov/Mamedov)",
+            variable=self.fuzzy_names_var
+        ).pack(pady=2, padx=10, anchor="w")
+        
+        # Təkrarlanan cütlər
+        self.dedupe_pairs_var = ctk.BooleanVar(value=self.dedupe_pairs)
+        ctk.CTkCheckBox(
+            frame,
+            text="Fayllar arasında təkrarlanan cütləri sil",
+            variable=self.dedupe_pairs_var
+        ).pack(pady=2, padx=10, anchor="w")
+        
+        self.collapse_symmetric_var = ctk.BooleanVar(value=self.collapse_symmetric)
+        ctk.CTkCheckBox(
+            frame,
+            text="A/B və B/A cütlərini birləşdir",
+            variable=self.collapse_symmetric_var
+        ).pack(pady=2, padx=10, anchor="w")
+
+    def create_theme_settings(self, parent):
+        """Temanı dəyişdir"""
+        frame = ctk.CTkFrame(parent)
+        frame.pack(fill="x", pady=10)
+        
+        ctk.CTkLabel(
+            frame,
+            text="Tema Parametrləri",
+            font=("Helvetica Bold", 14)
+        ).pack(pady=10)
+        
+        # Tema seçimi
+        themes = {
+            "Sistem": "System",
+            "İşıqlı": "Light",
+            "Qaranlıq": "Dark"
+        }
+        
+        self.theme_var = ctk.StringVar(value="Qaranlıq")  # Varsayılan değer
+        
+        for az_name, eng_name in themes.items():
+            ctk.CTkRadioButton(
+                frame,
+                text=az_name,
+                variable=self.theme_var,
+                value=eng_name,
+                command=self.change_theme
+            ).pack(pady=5)
+
+    def change_theme(self):
+        """Temanı dəyişdir"""
+        selected_theme = self.theme_var.get()
+        ctk.set_appearance_mode(selected_theme)
         
         # Tema değişikliğini kaydet
         try:
@@ -751,7 +2983,9 @@ class ModernTravelAnalyzer:
             "Tarix",
             "Saat",
             "Vaxt Fərqi",
-            "Sərhəd Məntəqəsi"
+            "Sərhəd Məntəqəsi",
+            "Təkrar",
+            "Birgə Dövr"
         ]
         
         self.column_vars = {}
@@ -769,18 +3003,91 @@ class ModernTravelAnalyzer:
         """Parametrləri saxla"""
         try:
             max_time = int(self.max_time_var.get())
-            if 5 <= max_time <= 60:
+            if MIN_TIME_LIMIT <= max_time <= MAX_TIME_LIMIT:
                 self.max_time = max_time
             else:
                 raise ValueError
         except ValueError:
             CTkMessagebox(
                 title="Xəta",
-                message="Maksimum zaman 5-60 dakika arasında olmalıdır!",
+                message=f"Maksimum zaman {MIN_TIME_LIMIT}-{MAX_TIME_LIMIT} dakika arasında olmalıdır!",
+                icon="error"
+            )
+            return
+        
+        try:
+            max_workers = int(self.max_workers_var.get())
+            if 1 <= max_workers <= 64:
+                self.max_workers = max_workers
+            else:
+                raise ValueError
+        except ValueError:
+            CTkMessagebox(
+                title="Xəta",
+                message="Paralel işçi sayı 1-64 arasında olmalıdır!",
+                icon="error"
+            )
+            return
+        
+        try:
+            top_k = int(self.top_k_var.get())
+            if top_k >= 0:
+                self.top_k = top_k
+            else:
+                raise ValueError
+        except ValueError:
+            CTkMessagebox(
+                title="Xəta",
+                message="Ən yaxşı cüt sayı 0 və ya müsbət tam ədəd olmalıdır!",
                 icon="error"
             )
             return
         
+        try:
+            memory_budget_mb = int(self.memory_budget_var.get())
+            if memory_budget_mb >= 0:
+                self.memory_budget_mb = memory_budget_mb
+            else:
+                raise ValueError
+        except ValueError:
+            CTkMessagebox(
+                title="Xəta",
+                message="Yaddaş limiti 0 və ya müsbət tam ədəd (MB) olmalıdır!",
+                icon="error"
+            )
+            return
+        
+        try:
+            convoy_min_days = int(self.convoy_min_days_var.get())
+            if convoy_min_days >= 2:
+                self.convoy_min_days = convoy_min_days
+            else:
+                raise ValueError
+        except ValueError:
+            CTkMessagebox(
+                title="Xəta",
+                message="Konvoy üçün minimum gün sayı 2 və ya daha böyük olmalıdır!",
+                icon="error"
+            )
+            return
+        
+        self.partitioned = self.partitioned_var.get()
+        self.cross_border = self.cross_border_var.get()
+        self.fuzzy_names = self.fuzzy_names_var.get()
+        self.dedupe_pairs = self.dedupe_pairs_var.get()
+        self.collapse_symmetric = self.collapse_symmetric_var.get()
+        
+        # Mevcut adaylar yeni eşiği kapsıyorsa dosyalar okunmadan yeniden süzülür,
+        # eşleştirme seçenekleri değiştiyse dosyalar yeniden eşleştirilir. Analiz
+        # sürüyorsa finish_analysis sonuçları yeni seçeneklerle karşılaştırır
+        if self.analysis is None and self.file_results and self.main_dataset is not None:
+            if self.results_key == self.results_key_for(self.main_dataset):
+                self.rebuild_match_results()
+                self.display_results()
+                self.refresh_charts()
+            elif self.comparison_files or self.self_match:
+                self.analyze_data()
+        
         # Tema ayarı
         ctk.set_appearance_mode(self.theme_var.get())
         
@@ -837,17 +3144,14 @@ class ModernTravelAnalyzer:
     def refresh_data(self):
         """Məlumatları yenilə"""
         try:
-            # Sonuçları temizle
-            self.match_results = {
-                'entry': [], 
-                'exit': [], 
-                'complete': []
-            }
+            # Sonuçları temizle (tüm dosyalar yeniden eşleştirilir)
+            self.stop_analysis()
+            self.discard_results()
+            self.match_results = empty_results()
             
-            # Tüm frameleri temizle
+            # Tüm tabloları temizle
             for frame in self.result_frames.values():
-                for widget in frame.winfo_children():
-                    widget.destroy()
+                frame.clear()
             
             # İstatistikleri sıfırla
             for label in self.stats_labels.values():
@@ -857,9 +3161,8 @@ class ModernTravelAnalyzer:
             self.status_label.configure(text="Yenilənir...")
             
             # Eğer dosyalar varsa analizi tekrar başlat
-            if self.main_file and self.comparison_files:
+            if self.main_file and (self.comparison_files or self.self_match):
                 self.analyze_data()
-                self.status_label.configure(text="Analiz tamamlandı")
             else:
                 self.status_label.configure(text="Hazırdır")
             
@@ -872,12 +3175,16 @@ class ModernTravelAnalyzer:
         try:
             file_path = filedialog.askopenfilename(
                 title="Əsas faylı seçin",
-                filetypes=[("Excel faylları", "*.xlsx;*.xls")],
+                filetypes=FILE_TYPES,
                 initialdir=os.path.expanduser("~")  # Kullanıcı klasöründen başla
             )
             
             if file_path:
+                # Ana dosyayı bir kez oku ve hazırla (eski ana dosyanın analizi geçersiz)
+                self.stop_analysis()
+                self.main_dataset = PreparedDataset.from_file(file_path).intern(self.pool)
                 self.main_file = file_path
+                
                 self.main_file_label.configure(
                     text=os.path.basename(file_path)
                 )
@@ -893,45 +3200,47 @@ class ModernTravelAnalyzer:
                 icon="error"
             )
 
+    def toggle_self_match(self):
+        """Əsas faylın öz-özü ilə uyğunlaşdırılmasını aç/bağla"""
+        self.self_match = self.self_match_var.get()
+        if not self.main_file:
+            return
+        
+        if self.self_match or self.comparison_files:
+            self.analyze_data()
+        else:
+            # Gösterilecek bir şey kalmadı
+            self.stop_analysis()
+            self.rebuild_match_results()
+            self.display_results()
+
     def select_comparison_files(self):
         """Müqayisə fayllarını seç"""
         try:
             filenames = filedialog.askopenfilenames(
                 title="Karşılaştırma Dosyalarını Seç",
-                filetypes=[("Excel files", "*.xlsx *.xls")]
+                filetypes=FILE_TYPES
             )
             
             if filenames:
                 # Her seçilen dosya için
                 for filename in filenames:
                     try:
-                        # Dosyayı oku ve kontrol et
-                        df = pd.read_excel(filename)
-                        required_columns = [
-                            'Keçid zamanı', 
-                            'Soyadı, Adı (Lat)', 
-                            'İstiqamət', 
-                            'Sərhəd nəzarət məntəqəsi'
-                        ]
+                        # Sadece başlık satırını oku ve kontrol et
+                        missing_cols = missing_columns(filename)
                         
-                        if all(col in df.columns for col in required_columns):
+                        if not missing_cols:
                             # Tekrarı önle
                             if filename not in self.comparison_files:
                                 self.comparison_files.append(filename)
                                 
                                 # Dosya listesini güncelle
-                                self.files_list.delete("1.0", "end")
-                                for idx, file in enumerate(self.comparison_files, 1):
-                                    self.files_list.insert("end", f"{idx}. {os.path.basename(file)}\n")
-                                
-                                # Temizle butonunu aktif et
-                                self.clear_btn.configure(state="normal")
+                                self.update_files_list()
                                 
                                 # Durum çubuğunu güncelle
                                 self.status_label.configure(text="Müqayisə faylı əlavə edildi")
                                 
                         else:
-                            missing_cols = [col for col in required_columns if col not in df.columns]
                             CTkMessagebox(
                                 title="Xəta",
                                 message=f"{os.path.basename(filename)}: Gerekli sütunlar eksik: {', '.join(missing_cols)}",
@@ -956,29 +3265,70 @@ class ModernTravelAnalyzer:
                 icon="error"
             )
 
+    def update_files_list(self):
+        """Müqayisə faylları siyahısını yenilə"""
+        self.files_list.delete("1.0", "end")
+        for idx, file in enumerate(self.comparison_files, 1):
+            self.files_list.insert("end", f"{idx}. {os.path.basename(file)}\n")
+        
+        # Butonları dosya varsa aktif et
+        state = "normal" if self.comparison_files else "disabled"
+        self.clear_btn.configure(state=state)
+        self.remove_btn.configure(state=state)
+
+    def remove_comparison_file(self):
+        """Kursorun olduğu sətirdəki müqayisə faylını sil"""
+        try:
+            line = int(self.files_list.index("insert").split('.')[0])
+            if not 1 <= line <= len(self.comparison_files):
+                return
+            
+            running = self.analysis is not None
+            self.stop_analysis()
+            removed = self.comparison_files.pop(line - 1)
+            self.update_files_list()
+            
+            # Sadece bu dosyanın katkısını çıkar, diğerleri yeniden hesaplanmaz
+            self.discard_results([removed])
+            self.rebuild_match_results()
+            self.display_results()
+            
+            self.status_label.configure(
+                text=f"{os.path.basename(removed)} silindi"
+            )
+            
+            # Durdurulan analizin henüz eşleştirmediği dosyalar varsa analiz sürdürülür
+            if running and any(source not in self.file_results for source in self.result_sources()):
+                self.analyze_data()
+            
+        except Exception as e:
+            CTkMessagebox(
+                title="Xəta",
+                message=f"Fayl silmə xətası: {str(e)}",
+                icon="error"
+            )
+
     def clear_comparison_files(self):
         """Müqayisə fayllarını təmizlə"""
         try:
             # Dosya listesini temizle
+            self.stop_analysis()
             self.comparison_files = []
+            self.discard_results()
             
             # Metin kutusunu temizle
             self.files_list.delete("1.0", "end")
             
             # Butonları devre dışı bırak
             self.clear_btn.configure(state="disabled")
+            self.remove_btn.configure(state="disabled")
             
             # Sonuçları temizle
-            self.match_results = {
-                'entry': [], 
-                'exit': [], 
-                'complete': []
-            }
+            self.match_results = empty_results()
             
-            # Tüm frameleri temizle
+            # Tüm tabloları temizle
             for frame in self.result_frames.values():
-                for widget in frame.winfo_children():
-                    widget.destroy()
+                frame.clear()
             
             # İstatistikleri sıfırla
             for label in self.stats_labels.values():
@@ -995,7 +3345,14 @@ class ModernTravelAnalyzer:
             )
 
     def on_search_change(self, *args):
-        """Arama değiştiğinde çağrılır"""
+        """Arama değiştiğinde çağrılır; yazma bitene kadar arama ertelenir"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        """Aktiv tabda axtarışı indeks üzərindən icra et"""
+        self.search_job = None
         try:
             search_text = self.search_var.get().lower()
             
@@ -1007,28 +3364,14 @@ class ModernTravelAnalyzer:
                     break
             
             if active_tab:
-                # Tüm sonuçları gizle
-                for widget in self.result_frames[active_tab].winfo_children():
-                    widget.pack_forget()
-                
-                # Arama kriterlerine uyan sonuçları göster
-                for match in self.match_results[active_tab]:
-                    if (search_text in match.person_a.lower() or 
-                        search_text in match.person_b.lower() or 
-                        search_text in match.border.lower() or 
-                        search_text in match.date.lower()):
-                        
-                        # Sonuç satırını yeniden oluştur
-                        self.create_result_row(
-                            self.result_frames[active_tab],
-                            match,
-                            self.match_results[active_tab],
-                            active_tab
-                        )
+                # İndeks sonuç kümesi başına bir kez kurulur; görünen satırlar yerinde güncellenir
+                matches = self.match_results[active_tab]
+                found = matches.search_index.find(search_text)
+                self.result_frames[active_tab].show(matches, found)
                 
                 # Durum çubuğunu güncelle
-                visible_count = len(self.result_frames[active_tab].winfo_children())
-                total_count = len(self.match_results[active_tab])
+                visible_count = len(found)
+                total_count = len(matches)
                 self.status_label.configure(
                     text=f"Göstərilən: {visible_count}/{total_count}"
                 )
@@ -1070,65 +3413,227 @@ class ModernTravelAnalyzer:
         return colors.get(tab_name, 'transparent')
 
     def analyze_data(self):
-        """Verileri analiz et ve sonuçları sırala"""
+        """Analizi fon axınında başlat (pəncərə donmur, gedişat status panelində)"""
         try:
-            if not self.main_file or not self.comparison_files:
+            if not self.main_file or not (self.comparison_files or self.self_match):
                 print("Dosyalar eksik")  # Debug
                 return
             
-            # Ana dosyayı oku
-            main_df = pd.read_excel(self.main_file)
-            print(f"Ana dosya okundu: {len(main_df)} satır")  # Debug
+            # Devam eden analiz durdurulur, yeni girdilerle baştan başlar
+            self.stop_analysis()
             
-            # Sonuçları temizle
-            self.match_results = {
-                'entry': [],
-                'exit': [],
-                'complete': []
-            }
+            # İşçi oturum durumunu okumaz: girdiler burada kopyalanır
+            files = list(self.comparison_files)
+            budget = self.memory_budget()
+            total_files = len(files) + (1 if self.self_match else 0)
+            progress = AnalysisProgress(total_files, self.file_results, self.results_key)
+            self.analysis = progress
+            progress.thread = threading.Thread(
+                target=self.run_analysis,
+                args=(progress, files, self.self_match, self.match_options(), budget,
+                      self.get_spill_dir() if budget is not None else None, self.max_workers),
+                daemon=True
+            )
             
-            # Her karşılaştırma dosyası için
-            for comp_file in self.comparison_files:
-                try:
-                    # Karşılaştırma dosyasını oku
-                    comp_df = pd.read_excel(comp_file)
-                    print(f"Karşılaştırma dosyası okundu: {len(comp_df)} satır")  # Debug
-                    
-                    # Giriş ve çıkış eşleşmelerini bul
-                    entry_matches = self.find_matches(main_df, comp_df, 'Giriş')
-                    exit_matches = self.find_matches(main_df, comp_df, 'Çıxış')
-                    
-                    print(f"Bulunan eşleşmeler - Giriş: {len(entry_matches)}, Çıkış: {len(exit_matches)}")  # Debug
-                    
-                    # Sonuçları listeye ekle
-                    self.match_results['entry'].extend(entry_matches)
-                    self.match_results['exit'].extend(exit_matches)
-                    
-                    # Tam eşleşmeleri bul
-                    complete_matches = self.find_complete_matches(entry_matches, exit_matches)
-                    print(f"Tam eşleşmeler: {len(complete_matches)}")  # Debug
-                    
-                    self.match_results['complete'].extend(complete_matches)
-                    
-                except Exception as e:
-                    print(f"Dosya analiz hatası: {str(e)}")  # Debug
-                    CTkMessagebox(
-                        title="Xəbərdarlıq",
-                        message=f"{os.path.basename(comp_file)} dosyası analiz edilirken hata: {str(e)}",
-                        icon="warning"
-                    )
+            # Sonuçlar geldikçe gösterilir; sıralama analiz bitince uygulanır
+            for matches in self.match_results.values():
+                matches.discard()
+            self.match_results = empty_results()
+            self.live_counts = {category: 0 for category in self.match_results}
+            for frame in self.result_frames.values():
+                frame.clear()
+            for label in self.stats_labels.values():
+                label.configure(text="0")
+            
+            # İlerleme çubuğu ve iptal butonu
+            self.progress_bar.set(0)
+            self.progress_bar.pack(side="left", padx=10)
+            self.cancel_btn.pack(side="left", padx=5)
+            self.status_label.configure(text="Analiz edilir...")
+            
+            progress.thread.start()
+            self.root.after(PROGRESS_INTERVAL_MS, self.poll_analysis, progress)
+            
+        except Exception as e:
+            CTkMessagebox(
+                title="Xəta",
+                message=f"Analiz hatası: {str(e)}",
+                icon="error"
+            )
+
+    def run_analysis(self, progress: AnalysisProgress, files: List[str], self_match: bool,
+                     options: MatchOptions, budget: Optional[int], spill_dir: Optional[str],
+                     workers: int):
+        """Fayl nəticələrini hesabla (fon axını; Tk vidcetlərinə və sessiya nəticələrinə toxunmur)
+
+        Girdilər analyze_data-da köçürülür ki, analiz zamanı edilən dəyişikliklər
+        (fayl siyahısı, parametrlər) işçinin gördüyü vəziyyəti dəyişməsin.
+        """
+        try:
+            # Ana dosya oturum başına bir kez hazırlanır
+            main = progress.main = self.get_main_dataset()
+            progress.add()
+            
+            # Ana dosya veya eşleştirme ayarları değiştiyse eski dosya sonuçları geçersizdir
+            progress.results_key = self.results_key_for(main, options)
+            results = progress.results
+            if progress.results_key == progress.cached_key:
+                results.update(progress.cached)
+            
+            # İsim indeksi bir kez kurulur; işçiler yalnız yeni isimleri ekler
+            if options.fuzzy_names:
+                main.pool.identities()
+            
+            # Daha önce eşleştirilmiş dosyaların sonuçları hemen gösterilir
+            for source in ([SELF_MATCH] if self_match else []) + files:
+                for category, store in results.get(source, {}).items():
+                    progress.emit(category, store)
+            
+            # Ana dosya kendisiyle tek taramada eşleştirilir (ikinci okuma yok)
+            if self_match:
+                if SELF_MATCH not in results:
+                    results[SELF_MATCH] = analyze_self(main, options, progress)
+                    progress.emit('complete', results[SELF_MATCH]['complete'])
+                    enforce_memory_budget(results, budget, spill_dir)
+                progress.add(files=1, matches=sum(
+                    len(store) for store in results[SELF_MATCH].values()
+                ))
+            
+            # Sadece henüz eşleştirilmemiş dosyaları analiz et
+            pending_files = [f for f in files if f not in results]
+            progress.files += len(files) - len(pending_files)
+            
+            # Her karşılaştırma dosyası için (dosya sırasıyla)
+            for comp_file, file_results in self.run_file_analyses(main, pending_files, options,
+                                                                  workers, progress):
+                if isinstance(file_results, Exception):
+                    progress.errors.append((comp_file, str(file_results)))
+                    progress.add(files=1)
+                    continue
+                
+                # Sonuçları oturum kodlarıyla dosya bazında sakla
+                results[comp_file] = {
+                    category: store.intern(main.pool)
+                    for category, store in file_results.items()
+                }
+                progress.emit('complete', results[comp_file]['complete'])
+                enforce_memory_budget(results, budget, spill_dir)
+                progress.add(files=1, matches=sum(len(store) for store in file_results.values()))
+            
+        except AnalysisCancelled:
+            pass  # Tamamlanan dosyalar finish_analysis'te gösterilir
+        except Exception as e:
+            progress.error = e
+
+    def poll_analysis(self, progress: AnalysisProgress):
+        """Fon analizinin gedişatını status panelinə yaz, bitibsə nəticələri göstər"""
+        if progress is not self.analysis:
+            # Durdurulan analizin işçisi bitince yalnız kendi diske yazdıkları silinir
+            if progress.thread.is_alive():
+                self.root.after(PROGRESS_INTERVAL_MS, self.poll_analysis, progress)
+            else:
+                self.discard_stale(progress)
+            return
+        
+        self.show_batches(progress)
+        
+        if progress.total_files:
+            self.progress_bar.set(min(1.0, progress.files / progress.total_files))
+        self.status_label.configure(
+            text=f"Analiz: {progress.files}/{progress.total_files} fayl, "
+                 f"{progress.rows} sətir, {progress.matches} uyğunluq (ilkin)"
+        )
+        
+        if progress.thread.is_alive():
+            self.root.after(PROGRESS_INTERVAL_MS, self.poll_analysis, progress)
+        else:
+            self.finish_analysis(progress)
+
+    def show_batches(self, progress: AnalysisProgress):
+        """Gələn uyğunluq partiyalarını cədvəllərə və sayğaclara əlavə et (sıralanmamış)
+
+        Canlı saylar ilkindir: fayllar arası təkrar cütlər və tam uyğunluqların
+        yenidən qurulması analiz bitəndə tətbiq olunur, ona görə son say kiçik
+        ola bilər. Sayğaclar bunu "~" ilə göstərir.
+        """
+        batches = defaultdict(list)
+        while progress.batches:
+            category, matches = progress.batches.popleft()
+            
+            # Adaylar daha geniş pencereyle bulunur; canlı görünümde de mevcut eşik uygulanır
+            keep = np.asarray(matches.time_diff) <= self.max_time
+            if matches.is_complete:
+                keep &= np.asarray(matches.exit_diff) <= self.max_time
+            batches[category].append(matches.take(np.flatnonzero(keep)))
+        
+        for category, stores in batches.items():
+            self.live_counts[category] += sum(len(store) for store in stores)
+            self.stats_labels[category].configure(text=f"~{self.live_counts[category]}")
             
-            print(f"Toplam sonuçlar: {self.match_results}")  # Debug
+            # Canlı tablo sınırlı tutulur, tam liste analiz bitince gösterilir
+            shown = self.match_results[category]
+            room = LIVE_MAX_ROWS - len(shown)
+            if room <= 0:
+                continue
+            complete = category == 'complete'
+            added = MatchStore.concat(stores, complete)
+            shown = MatchStore.concat([shown, added.take(np.arange(min(room, len(added))))], complete)
+            self.match_results[category] = shown
+            self.result_frames[category].show(shown, np.arange(len(shown)), keep_position=True,
+                                              provisional=True)
+
+    def finish_analysis(self, progress: AnalysisProgress):
+        """Bitmiş (və ya dayandırılmış) analizin nəticələrini birləşdir və göstər"""
+        self.analysis = None
+        self.hide_progress()
+        self.adopt_results(progress)
+        
+        # Analiz sürerken eşleştirme ayarları değiştiyse sonuçlar eski seçeneklerle
+        # bulundu; analiz yeni seçeneklerle yeniden başlatılır
+        if (progress.error is None and not progress.cancelled and progress.results_key is not None
+                and progress.results_key != self.results_key_for(progress.main)):
+            self.analyze_data()
+            return
+        
+        for comp_file, message in progress.errors:
+            CTkMessagebox(
+                title="Xəbərdarlıq",
+                message=f"{os.path.basename(comp_file)} dosyası analiz edilirken hata: {message}",
+                icon="warning"
+            )
+        
+        if progress.error is not None:
+            CTkMessagebox(
+                title="Xəta",
+                message=f"Analiz hatası: {str(progress.error)}",
+                icon="error"
+            )
+            return
+        
+        try:
+            # Dayandırılsa da tamamlanmış dosyaların sonuçları gösterilir
+            self.rebuild_match_results()
             
             # Sonuçları göster
             self.display_results()
             
             # İstatistikleri güncelle
             self.update_statistics()
+            self.refresh_charts()
             
             # Durum çubuğunu güncelle
             total_matches = sum(len(matches) for matches in self.match_results.values())
-            self.status_label.configure(text=f"Analiz tamamlandı. Cəmi {total_matches} uyğunluq tapıldı")
+            spilled = any(matches.is_spilled for matches in self.match_results.values())
+            note = " (nəticələr diskdə saxlanılır)" if spilled else ""
+            if progress.cancelled:
+                self.status_label.configure(
+                    text=f"Analiz dayandırıldı ({progress.files}/{progress.total_files} fayl). "
+                         f"Cəmi {total_matches} uyğunluq{note}"
+                )
+            else:
+                self.status_label.configure(
+                    text=f"Analiz tamamlandı. Cəmi {total_matches} uyğunluq tapıldı{note}"
+                )
             
         except Exception as e:
             print(f"Analiz ana hata: {str(e)}")  # Debug
@@ -1138,37 +3643,253 @@ class ModernTravelAnalyzer:
                 icon="error"
             )
 
-    def find_matches(self, df1: pd.DataFrame, df2: pd.DataFrame, direction: str) -> List[MatchResult]:
+    def cancel_analysis(self):
+        """Dayandır düyməsi: analiz növbəti hissə sərhədində dayanır"""
+        if self.analysis is not None:
+            self.analysis.cancel()
+            self.cancel_btn.configure(state="disabled")
+            self.status_label.configure(text="Analiz dayandırılır...")
+
+    def adopt_results(self, progress: AnalysisProgress):
+        """İşçinin topladığı nəticələri sessiyaya köçür (UI axını)"""
+        if progress.main is None:
+            return
+        self.main_dataset = progress.main
+        if progress.results_key is None:
+            return
+        if progress.results_key != self.results_key:
+            self.discard_results()
+            self.results_key = progress.results_key
+        self.file_results = progress.results
+
+    def discard_stale(self, progress: AnalysisProgress):
+        """Köçürülməyən analizin diskə yazdığı nəticələri sil"""
+        kept = {id(store) for results in self.file_results.values() for store in results.values()}
+        for results in progress.results.values():
+            for store in results.values():
+                if id(store) not in kept:
+                    store.discard()
+
+    def stop_analysis(self):
+        """Gedən analizi dayandır (fon axını gözlənilmir)
+
+        Fayl nəticələrini dəyişən əməliyyatlardan əvvəl çağırılır. İşçi
+        sessiya nəticələrinə yazmadığı üçün onun bitməsini gözləmək lazım
+        deyil; nəticələri köçürülmür, poll_analysis isə axın bitəndə qalıqları
+        silir.
+        """
+        progress = self.analysis
+        if progress is None:
+            return
+        self.analysis = None
+        progress.cancel()
+        self.hide_progress()
+
+    def hide_progress(self):
+        """İrəliləyiş zolağını və dayandırma düyməsini gizlət"""
+        self.progress_bar.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.cancel_btn.configure(state="normal")
+
+    def match_options(self) -> MatchOptions:
+        """Cari parametrlərdən uyğunlaşdırma seçimlərini yarat
+
+        Namizədlər həmişə MAX_TIME_LIMIT pəncərəsi ilə tapılır və max_time
+        birləşdirmə zamanı süzgəc kimi tətbiq olunur, ona görə həddi dəyişmək
+        faylları yenidən uyğunlaşdırmır; bunun qiyməti analizdə geniş
+        pəncərənin daha çox namizəd cütüdür. Top-K seçimi həddən asılı olduğu
+        üçün həmin rejimdə dəqiq hədd istifadə olunur.
+        """
+        return MatchOptions(
+            max_time=self.max_time if self.top_k else MAX_TIME_LIMIT,
+            cross_border=self.cross_border,
+            partitioned=self.partitioned,
+            top_k=self.top_k,
+            fuzzy_names=self.fuzzy_names
+        )
+
+    def results_key_for(self, main: PreparedDataset,
+                        options: Optional[MatchOptions] = None) -> Tuple:
+        """Fayl nəticələrinin etibarlı qaldığı açar (əsas fayl və uyğunlaşdırma seçimləri)"""
+        return (self.main_file, main.mtime, options or self.match_options())
+
+    def get_main_dataset(self) -> PreparedDataset:
+        """Əsas faylın hazırlanmış formasını qaytar, fayl dəyişibsə yenidən hazırla
+
+        Fon axınından çağırıldığı üçün self.main_dataset burada dəyişdirilmir;
+        yeni hazırlanan verilənləri finish_analysis saxlayır.
+        """
+        main = self.main_dataset
+        if main is None or main.source != self.main_file or main.is_stale():
+            main = PreparedDataset.from_file(self.main_file).intern(self.pool)
+        return main
+
+    def memory_budget(self) -> Optional[int]:
+        """Nəticələr üçün yaddaş limiti (bayt), limitsizdirsə None"""
+        return self.memory_budget_mb * 1024 * 1024 if self.memory_budget_mb else None
+
+    def get_spill_dir(self) -> str:
+        """Diskə yazılan nəticələr üçün sessiya qovluğu (çıxışda silinir)"""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix=SPILL_PREFIX)
+            atexit.register(shutil.rmtree, self.spill_dir, ignore_errors=True)
+        return self.spill_dir
+
+    def discard_results(self, files: Optional[List[str]] = None):
+        """Fayl nəticələrini sil (diskə yazılmış sütunlar da silinir)"""
+        if files is None:
+            files = list(self.file_results)
+            for matches in self.match_results.values():
+                matches.discard()
+        for comp_file in files:
+            for store in self.file_results.pop(comp_file, {}).values():
+                store.discard()
+
+    def result_sources(self) -> List[str]:
+        """Nəticələri birləşdiriləcək mənbələr (sıra ilə)"""
+        return ([SELF_MATCH] if self.self_match else []) + self.comparison_files
+
+    def rebuild_match_results(self):
+        """Fayl nəticələrini müqayisə faylları sırası ilə birləşdir
+
+        Bir neçə faylda təkrarlanan cütlərdən yalnız ilki saxlanılır. Yaddaşda
+        qalan fayl nəticələri ilə birləşmiş kateqoriyaların cəmi yaddaş
+        limitini aşırsa birləşmə birbaşa diskdəki memmap sütunlarına yazılır.
+        Təkrar və hədd maskaları hissə-hissə qurulur; sıralama və axtarış
+        indeksi isə yenə sətir başına bir neçə tam ədəd saxlayır.
+        """
+        files = [self.file_results[f] for f in self.result_sources() if f in self.file_results]
+        budget = self.memory_budget()
+        temporary = []
+        
+        # Namizədlər daha geniş pəncərə ilə tapılıbsa cari hədd süzgəc kimi tətbiq olunur
+        matched_time = self.results_key[2].max_time if self.results_key is not None else self.max_time
+        threshold = self.max_time if self.max_time < matched_time else None
+        threshold_masks = {category: [None] * len(files) for category in ['entry', 'exit', 'complete']}
+        if threshold is not None:
+            for category in ['entry', 'exit']:
+                threshold_masks[category] = [
+                    np.asarray(results[category].time_diff) <= threshold for results in files
+                ]
+            
+            # Tam uyğunluqlar (gün başına ilk cüt) süzülmüş giriş/çıxışlardan yenidən
+            # qurulur; diskdəki nəticələrin süzülmüş nüsxəsi də diskdə qalır
+            rebuilt = []
+            for results, entry_mask, exit_mask in zip(files, threshold_masks['entry'],
+                                                      threshold_masks['exit']):
+                directory = self.get_spill_dir() if results['entry'].is_spilled else None
+                entries = MatchStore.concat([results['entry']], directory=directory, masks=[entry_mask])
+                exits = MatchStore.concat([results['exit']], directory=directory, masks=[exit_mask])
+                complete = match_complete(entries, exits)
+                if directory is not None:
+                    complete = complete.spill(directory)
+                temporary += [entries, exits, complete]
+                rebuilt.append(dict(results, complete=complete))
+            files = rebuilt
+        
+        masks = {}
+        for category in ['entry', 'exit', 'complete']:
+            masks[category] = threshold_masks[category]
+            if self.dedupe_pairs:
+                stores = [results[category] for results in files]
+                masks[category] = [
+                    unique if mask is None else unique & mask
+                    for unique, mask in zip(unique_masks(stores, self.collapse_symmetric),
+                                            masks[category])
+                ]
+        
+        # Limit bütün kateqoriyaların və yaddaşdakı fayl nəticələrinin cəminə tətbiq olunur
+        spill = False
+        if budget is not None:
+            merged = sum(
+                store.nbytes if mask is None else store.nbytes * int(np.count_nonzero(mask)) // len(store)
+                for category in masks for results, mask in zip(files, masks[category])
+                for store in [results[category]] if len(store)
+            )
+            resident = sum(
+                store.nbytes for results in self.file_results.values()
+                for store in results.values() if not store.is_spilled
+            )
+            spill = merged + resident > budget
+        
+        for matches in self.match_results.values():
+            matches.discard()
+        
+        self.match_results = {}
+        for category in ['entry', 'exit', 'complete']:
+            self.match_results[category] = MatchStore.concat(
+                [results[category] for results in files],
+                complete=(category == 'complete'),
+                directory=self.get_spill_dir() if spill else None,
+                masks=masks[category]
+            )
+        for store in temporary:
+            store.discard()
+        
+        # Birden çok dosyada her dosyanın en iyi K çifti birleşir; sıralama
+        # bu birleşik çiftlerin sayılarıyla yapılır (bkz. match_top_k)
+        if self.top_k:
+            for category, matches in self.match_results.items():
+                self.match_results[category] = matches.top(self.top_k)
+                if self.match_results[category] is not matches:
+                    matches.discard()
+
+    def run_file_analyses(self, main: PreparedDataset, files: List[str], options: MatchOptions,
+                          workers: int, progress: Optional[AnalysisProgress] = None):
+        """Müqayisə fayllarını analiz et, nəticələri fayl sırası ilə qaytar
+
+        Tək işçidə dayandırma hissə sərhədində, proses hovuzunda isə nəticə
+        gözlənilərkən yoxlanır: gözləyən fayllar ləğv olunur, işləyən proseslər
+        isə arxa planda öz faylını bitirir (nəticəsi atılır).
+        """
+        workers = min(workers, len(files))
+        
+        # Tek işçi için havuz açmaya gerek yok
+        if workers <= 1:
+            for comp_file in files:
+                try:
+                    yield comp_file, analyze_comparison_file(main, comp_file, options, progress)
+                except AnalysisCancelled:
+                    raise
+                except Exception as e:
+                    yield comp_file, e
+            return
+        
+        # İptalde havuzun kapanması beklenmez (with bloğu çalışan dosyaları beklerdi)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        futures = [
+            executor.submit(analyze_comparison_file, main, comp_file, options)
+            for comp_file in files
+        ]
+        
+        try:
+            # Tamamlanma sırasına değil, dosya sırasına göre birleştir
+            for comp_file, future in zip(files, futures):
+                # Sonuç beklenirken de iptal kontrol edilir
+                while not concurrent.futures.wait([future], timeout=PROGRESS_INTERVAL_MS / 1000).done:
+                    if progress is not None:
+                        progress.add()
+                try:
+                    result = {
+                        category: store.intern(main.pool)
+                        for category, store in future.result().items()
+                    }
+                except Exception as e:
+                    result = e
+                else:
+                    # Süreçte bulunan giriş/çıkışlar dosya bitince gösterilir
+                    if progress is not None:
+                        progress.emit('entry', result['entry'])
+                        progress.emit('exit', result['exit'])
+                yield comp_file, result
+        finally:
+            # İptal edilirse henüz başlamamış dosyalar çalıştırılmaz
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def find_matches(self, main: PreparedDataset, comp: PreparedDataset, direction: str) -> MatchStore:
         """Giriş və ya çıxış uyğunluqlarını tap"""
         try:
-            # İstiqamətə görə filtrele
-            df1_filtered = df1[df1['İstiqamət'] == direction].copy()
-            df2_filtered = df2[df2['İstiqamət'] == direction].copy()
-            
-            # Tarihleri datetime'a çevir
-            df1_filtered['datetime'] = pd.to_datetime(df1_filtered['Keçid zamanı'], format='%d.%m.%Y %H:%M')
-            df2_filtered['datetime'] = pd.to_datetime(df2_filtered['Keçid zamanı'], format='%d.%m.%Y %H:%M')
-            
-            matches = []
-            for _, row1 in df1_filtered.iterrows():
-                for _, row2 in df2_filtered.iterrows():
-                    # Farklı kişiler olmalı
-                    if row1['Soyadı, Adı (Lat)'] != row2['Soyadı, Adı (Lat)']:
-                        # Zaman farkını hesapla
-                        time_diff = abs((row1['datetime'] - row2['datetime']).total_seconds() / 60)
-                        
-                        # 30 dakikadan az fark varsa
-                        if time_diff <= self.max_time:
-                            matches.append(MatchResult(
-                                person_a=row1['Soyadı, Adı (Lat)'],
-                                person_b=row2['Soyadı, Adı (Lat)'],
-                                date=row1['datetime'].strftime('%d.%m.%Y'),
-                                time=f"{row1['datetime'].strftime('%H:%M')}-{row2['datetime'].strftime('%H:%M')}",
-                                time_diff=int(time_diff),
-                                border=row1['Sərhəd nəzarət məntəqəsi']
-                            ))
-            
-            return matches
+            return match_datasets(main, comp, direction, self.match_options())
             
         except Exception as e:
             CTkMessagebox(
@@ -1176,149 +3897,21 @@ class ModernTravelAnalyzer:
                 message=f"Eşleşme arama hatası: {str(e)}",
                 icon="error"
             )
-            return []
+            return MatchStore.empty()
 
-    def find_complete_matches(self, entry_matches: List[MatchResult], 
-                             exit_matches: List[MatchResult]) -> List[MatchResult]:
+    def find_complete_matches(self, entry_matches: MatchStore, 
+                             exit_matches: MatchStore) -> MatchStore:
         """Tam uyğunluqları tap"""
-        complete_matches = []
-        seen_pairs = set()
-        
-        for entry in entry_matches:
-            for exit in exit_matches:
-                # Aynı kişiler ve sınır noktası kontrolü
-                if (entry.person_a == exit.person_a and 
-                    entry.person_b == exit.person_b and 
-                    entry.border == exit.border):
-                    
-                    # Tarih kontrolü
-                    entry_date = datetime.strptime(f"{entry.date} {entry.time.split('-')[0]}", '%d.%m.%Y %H:%M')
-                    exit_date = datetime.strptime(f"{exit.date} {exit.time.split('-')[0]}", '%d.%m.%Y %H:%M')
-                    
-                    if exit_date > entry_date:
-                        pair_key = f"{entry.person_a}_{entry.person_b}_{entry.date}_{exit.date}"
-                        
-                        if pair_key not in seen_pairs:
-                            complete_matches.append(MatchResult(
-                                person_a=entry.person_a,
-                                person_b=entry.person_b,
-                                date=f"{entry.date} - {exit.date}",
-                                time=f"{entry.time} - {exit.time}",
-                                time_diff=f"{entry.time_diff}/{exit.time_diff}",
-                                border=entry.border
-                            ))
-                            seen_pairs.add(pair_key)
-        
-        return complete_matches
+        return match_complete(entry_matches, exit_matches)
 
     def display_results(self):
         """Nəticələri göstər"""
         try:
-            # Tüm frameleri temizle
-            for frame in self.result_frames.values():
-                for widget in frame.winfo_children():
-                    widget.destroy()
-            
-            # Her kategori için başlık satırı oluştur
-            headers = [
-                ("Şəxs A (Sayı)", 200), 
-                ("Şəxs B (Sayı)", 200), 
-                ("Tarix", 150),
-                ("Saat", 150), 
-                ("Vaxt Fərqi", 100), 
-                ("Sərhəd Məntəqəsi", 200)
-            ]
-            
-            # Tab renklerini belirle
-            tab_colors = {
-                'entry': '#1a73e8',  # Mavi
-                'exit': '#34a853',   # Yeşil
-                'complete': '#673ab7' # Mor
-            }
-            
-            # Her kategori için sonuçları göster ve sırala
+            # Sonuçlar eşleşme sayısına (azalan) ve zaman farkına (artan) göre sıralı;
+            # tablolar sadece görünen satırları çizer, kopyalama yapılmaz
             for category in ['entry', 'exit', 'complete']:
-                frame = self.result_frames[category]
-                
-                # Her kategoride kişilerin toplam eşleşme sayısını hesapla
-                person_counts = {}
-                for match in self.match_results[category]:
-                    person_counts[match.person_a] = person_counts.get(match.person_a, 0) + 1
-                    person_counts[match.person_b] = person_counts.get(match.person_b, 0) + 1
-                
-                # Başlık satırı
-                header_frame = ctk.CTkFrame(frame, fg_color=tab_colors[category])
-                header_frame.pack(fill="x", pady=(0, 10))
-                
-                # Toplam sayı gösterimi
-                total_label = ctk.CTkLabel(
-                    header_frame,
-                    text=f"Ümumi: {len(self.match_results[category])}",
-                    font=("Helvetica Bold", 12)
-                )
-                total_label.pack(side="right", padx=10, pady=5)
-                
-                # Header etiketleri
-                for text, width in headers:
-                    label = ctk.CTkLabel(
-                        header_frame,
-                        text=text,
-                        font=("Helvetica Bold", 12),
-                        width=width
-                    )
-                    label.pack(side="left", padx=5, pady=5)
-                
-                # Sonuçları eşleşme sayısına ve zaman farkına göre sırala
-                sorted_matches = sorted(
-                    self.match_results[category],
-                    key=lambda x: (
-                        -(person_counts[x.person_a] + person_counts[x.person_b]),  # Önce eşleşme sayısına göre azalan
-                        float(x.time_diff.split('/')[0]) if isinstance(x.time_diff, str) 
-                        else float(x.time_diff)  # Sonra zaman farkına göre artan
-                    )
-                )
-                
-                # Sıralanmış sonuçları göster
-                for match in sorted_matches:
-                    row = ctk.CTkFrame(frame)
-                    row.pack(fill="x", pady=2)
-                    
-                    # Zaman farkına göre renk
-                    time_diff = (
-                        float(match.time_diff.split('/')[0]) 
-                        if isinstance(match.time_diff, str) 
-                        else float(match.time_diff)
-                    )
-                    
-                    # Renk belirleme
-                    if category == 'complete':
-                        bg_color = "#8B0000"  # Tam eşleşmeler için koyu kırmızı
-                    else:
-                        bg_color = self.get_time_diff_color(time_diff)
-                    
-                    row.configure(fg_color=bg_color)
-                    
-                    # Veri alanları
-                    fields = [
-                        (f"{match.person_a} ({person_counts[match.person_a]})", 200),
-                        (f"{match.person_b} ({person_counts[match.person_b]})", 200),
-                        (match.date, 150),
-                        (match.time, 150),
-                        (f"{match.time_diff} dk", 100),
-                        (match.border, 200)
-                    ]
-                    
-                    for text, width in fields:
-                        label = ctk.CTkLabel(
-                            row,
-                            text=str(text),
-                            font=("Helvetica", 12),
-                            width=width
-                        )
-                        label.pack(side="left", padx=5, pady=5)
-                
-                # Sıralanmış sonuçları kaydet
-                self.match_results[category] = sorted_matches
+                matches = self.match_results[category]
+                self.result_frames[category].show(matches, matches.rank_order())
             
             # İstatistikleri güncelle
             self.update_statistics()
@@ -1330,48 +3923,30 @@ class ModernTravelAnalyzer:
                 icon="error"
             )
 
-    def create_result_row(self, parent, match, person_counts, category):
-        """Nəticə sətri yarat"""
-        try:
-            # Satır container'ı
-            row = ctk.CTkFrame(parent)
-            row.pack(fill="x", pady=2)
-            
-            # Arkaplan rengini belirle
-            if category == 'complete':
-                bg_color = "#8B0000"  # Tam eşleşmeler için koyu kırmızı
-            else:
-                # Zaman farkına göre renk
-                time_diff = (
-                    float(match.time_diff.split('/')[0]) 
-                    if isinstance(match.time_diff, str) 
-                    else float(match.time_diff)
-                )
-                bg_color = self.get_time_diff_color(time_diff)
-            
-            row.configure(fg_color=bg_color)
-            
-            # Veri alanları
-            fields = [
-                (f"{match.person_a} ({person_counts[match.person_a]})", 200),
-                (f"{match.person_b} ({person_counts[match.person_b]})", 200),
-                (match.date, 150),
-                (match.time, 150),
-                (f"{match.time_diff} dk", 100),
-                (match.border, 200)
-            ]
-            
-            for text, width in fields:
-                label = ctk.CTkLabel(
-                    row,
-                    text=str(text),
-                    font=("Helvetica", 12),
-                    width=width
-                )
-                label.pack(side="left", padx=5, pady=5)
-            
-        except Exception as e:
-            print(f"Sətir yaratma xətası: {str(e)}")
+    def result_cell_values(self, matches: MatchStore, index: int) -> Dict[str, str]:
+        """Bir nəticə sətrinin sütun mətnləri"""
+        # Metinler sadece gösterilen satır için oluşturulur
+        match = matches.row(index)
+        summary = matches.summary
+        person_counts = summary.person_counts
+        
+        return {
+            "Şəxs A": f"{match.person_a} ({person_counts[matches.person_a[index]]})",
+            "Şəxs B": f"{match.person_b} ({person_counts[matches.person_b[index]]})",
+            "Tarix": match.date,
+            "Saat": match.time,
+            "Vaxt Fərqi": match.diff_text,
+            "Sərhəd Məntəqəsi": str(match.border),
+            "Təkrar": str(summary.repeats[index]),
+            "Birgə Dövr": summary.period_text(index)
+        }
+
+    def result_row_color(self, matches: MatchStore, index: int) -> str:
+        """Nəticə sətrinin arxa fon rəngi"""
+        if matches.is_complete:
+            return "#8B0000"  # Tam eşleşmeler için koyu kırmızı
+        # Zaman farkına göre renk
+        return self.get_time_diff_color(matches.time_diff[index])
 
     def get_time_diff_color(self, time_diff: int) -> str:
         """Vaxt fərqinə görə rəng qaytar"""
@@ -1484,6 +4059,143 @@ class ModernTravelAnalyzer:
                 icon="warning"
             )
 
+    def show_convoys(self):
+        """Konvoy axtarışını fon axınında başlat (gedişat status panelində)"""
+        if not self.main_file:
+            CTkMessagebox(
+                title="Xəbərdarlıq",
+                message="Zəhmət olmasa əvvəlcə əsas faylı seçin!",
+                icon="warning"
+            )
+            return
+        
+        # Analizle aynı anda dosyalar ikinci kez okunmaz
+        if self.analysis is not None:
+            CTkMessagebox(
+                title="Xəbərdarlıq",
+                message="Analiz davam edir, bitdikdən sonra yenidən cəhd edin.",
+                icon="warning"
+            )
+            return
+        
+        progress = AnalysisProgress(len(self.comparison_files) + 1)
+        self.analysis = progress
+        progress.thread = threading.Thread(
+            target=self.run_convoys,
+            args=(progress, list(self.comparison_files), self.max_time, self.convoy_min_days),
+            daemon=True
+        )
+        
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=10)
+        self.cancel_btn.pack(side="left", padx=5)
+        self.status_label.configure(text="Konvoylar axtarılır...")
+        
+        progress.thread.start()
+        self.root.after(PROGRESS_INTERVAL_MS, self.poll_convoys, progress,
+                        self.max_time, self.convoy_min_days)
+
+    def run_convoys(self, progress: AnalysisProgress, files: List[str], max_time: int,
+                    min_days: int):
+        """Konvoyları hesabla (fon axını; Tk vidcetlərinə toxunmur)"""
+        try:
+            # Ana ve karşılaştırma dosyaları aynı havuzla kodlanır; hazır ana
+            # dosya ve keşlenmiş dosyalar yeniden ayrıştırılmaz
+            main = progress.main = self.get_main_dataset()
+            progress.add(files=1, rows=len(main))
+            datasets = [main]
+            for comp_file in files:
+                datasets.append(PreparedDataset.from_file(comp_file).intern(main.pool))
+                progress.add(files=1, rows=len(datasets[-1]))
+            
+            progress.convoys = detect_convoys(datasets, max_time, min_days)
+        except AnalysisCancelled:
+            pass
+        except Exception as e:
+            progress.error = e
+
+    def poll_convoys(self, progress: AnalysisProgress, max_time: int, min_days: int):
+        """Konvoy axtarışının gedişatını göstər, bitibsə nəticə pəncərəsini aç"""
+        if progress is not self.analysis:
+            return  # Durduruldu; işçi oturum durumuna yazmaz
+        
+        if progress.total_files:
+            self.progress_bar.set(min(1.0, progress.files / progress.total_files))
+        self.status_label.configure(
+            text=f"Konvoylar: {progress.files}/{progress.total_files} fayl, {progress.rows} sətir"
+        )
+        if progress.thread.is_alive():
+            self.root.after(PROGRESS_INTERVAL_MS, self.poll_convoys, progress, max_time, min_days)
+            return
+        
+        self.analysis = None
+        self.hide_progress()
+        if progress.main is not None:
+            self.main_dataset = progress.main
+        
+        if progress.error is not None:
+            self.status_label.configure(text="Konvoy analizi xətası")
+            CTkMessagebox(
+                title="Xəta",
+                message=f"Konvoy analizi xətası: {str(progress.error)}",
+                icon="error"
+            )
+            return
+        if progress.convoys is None:
+            self.status_label.configure(text="Konvoy axtarışı dayandırıldı")
+            return
+        
+        self.status_label.configure(text=f"{len(progress.convoys)} konvoy tapıldı")
+        self.display_convoys(progress.convoys, max_time, min_days)
+
+    def display_convoys(self, convoys: List['Convoy'], max_time: int, min_days: int):
+        """Bir neçə gün birlikdə keçən qrupların (konvoyların) pəncərəsi"""
+        if not convoys:
+            CTkMessagebox(
+                title="Məlumat",
+                message=f"{min_days} və ya daha çox gün birlikdə keçən qrup tapılmadı.",
+                icon="info"
+            )
+            return
+        
+        convoy_window = ctk.CTkToplevel(self.root)
+        convoy_window.title("Konvoylar")
+        convoy_window.geometry("700x500")
+        
+        ctk.CTkLabel(
+            convoy_window,
+            text=f"{len(convoys)} qrup tapıldı (maks. {max_time} dəq, "
+                 f"min. {min_days} gün)",
+            font=("Helvetica Bold", 14)
+        ).pack(pady=10)
+        
+        frame = ctk.CTkScrollableFrame(
+            convoy_window,
+            fg_color=self.colors["frame_bg"],
+            corner_radius=10
+        )
+        frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        
+        for idx, convoy in enumerate(convoys, 1):
+            row = ctk.CTkFrame(frame)
+            row.pack(fill="x", pady=3, padx=5)
+            
+            ctk.CTkLabel(
+                row,
+                text=f"{idx}. " + ", ".join(str(member) for member in convoy.members),
+                font=("Helvetica Bold", 12),
+                wraplength=640,
+                justify="left"
+            ).pack(anchor="w", padx=10, pady=(5, 0))
+            
+            ctk.CTkLabel(
+                row,
+                text=f"Gün: {convoy.days}  |  Sərhəd: {', '.join(convoy.borders)}  |  "
+                     f"Son: {convoy.last_seen}",
+                font=("Helvetica", 12),
+                text_color=("gray40", "gray70")
+            ).pack(anchor="w", padx=10, pady=(0, 5))
+
     def refresh_results_table(self, frame, visible_columns):
         """Nəticələr cədvəlini yenilə"""
         try:
@@ -1497,83 +4209,20 @@ class ModernTravelAnalyzer:
             if not active_tab:
                 return
             
-            # Mevcut içeriği temizle
-            for widget in frame.winfo_children():
-                widget.destroy()
-            
-            # Başlık satırını güncelle
-            header_frame = ctk.CTkFrame(frame, fg_color=self.colors["section_bg"])
-            header_frame.pack(fill="x", pady=(0, 10))
+            # "Şəxs Bilgileri" ayarı her iki kişi sütununu kapsar
+            visible = set(visible_columns)
+            if "Şəxs Bilgileri" in visible:
+                visible.update(["Şəxs A", "Şəxs B"])
             
-            # Toplam sayı etiketi
-            total_label = ctk.CTkLabel(
-                header_frame,
-                text=f"Ümumi: {len(self.match_results[active_tab])}",
-                font=("Helvetica Bold", 12),
-                width=100
+            # Başlık ve satır havuzu görünür sütunlarla yeniden kurulur
+            frame.set_columns(
+                [column for column in RESULT_COLUMNS if column[0] in visible],
+                self.colors["section_bg"]
             )
-            total_label.pack(side="right", padx=10, pady=5)
-            
-            # Görünür sütunlar için başlıklar
-            column_widths = {
-                "Şəxs A": 200,
-                "Şəxs B": 200,
-                "Tarix": 150,
-                "Saat": 150,
-                "Vaxt Fərqi": 100,
-                "Sərhəd Məntəqəsi": 200,
-                "Təkrar": 80  # Yeni sütun
-            }
-            
-            for col in visible_columns:
-                label = ctk.CTkLabel(
-                    header_frame,
-                    text=col,
-                    font=("Helvetica Bold", 12),
-                    width=column_widths.get(col, 150)
-                )
-                label.pack(side="left", padx=5, pady=5)
-            
-            # Kişi sayılarını hesapla
-            person_counts = {}
-            for match in self.match_results[active_tab]:
-                person_counts[match.person_a] = person_counts.get(match.person_a, 0) + 1
-                person_counts[match.person_b] = person_counts.get(match.person_b, 0) + 1
             
-            # Sonuç satırlarını güncelle
-            for match in self.match_results[active_tab]:
-                row = ctk.CTkFrame(frame)
-                row.pack(fill="x", pady=2)
-                
-                # Zaman farkına göre renk
-                time_diff = (
-                    int(match.time_diff.split('/')[0]) 
-                    if isinstance(match.time_diff, str) 
-                    else match.time_diff
-                )
-                bg_color = self.get_time_diff_color(time_diff)
-                row.configure(fg_color=bg_color)
-                
-                # Görünür sütunlar için veriler
-                field_map = {
-                    "Şəxs A": (f"{match.person_a} ({person_counts[match.person_a]})", 200),
-                    "Şəxs B": (f"{match.person_b} ({person_counts[match.person_b]})", 200),
-                    "Tarix": (match.date, 150),
-                    "Saat": (match.time, 150),
-                    "Vaxt Fərqi": (f"{match.time_diff} dk", 100),
-                    "Sərhəd Məntəqəsi": (match.border, 200)
-                }
-                
-                for col in visible_columns:
-                    if col in field_map:
-                        text, width = field_map[col]
-                        label = ctk.CTkLabel(
-                            row,
-                            text=str(text),
-                            font=("Helvetica", 12),
-                            width=width
-                        )
-                        label.pack(side="left", padx=5, pady=5)
+            # Sonuçları sıralama düzeniyle bağla
+            matches = self.match_results[active_tab]
+            frame.show(matches, matches.rank_order())
                         
         except Exception as e:
             print(f"Cədvəl yeniləmə xətası: {str(e)}")
@@ -1598,78 +4247,55 @@ class ModernTravelAnalyzer:
                     break
             
             if aktiv_tab:
-                # Bütün nəticələri gizle
-                for widget in self.result_frames[aktiv_tab].winfo_children():
-                    widget.pack_forget()
-                
                 # Filtrləri al
                 vaxt_filtri = self.vaxt_filtri.get()
                 serhed_filtri = self.serhed_filtri.get()
                 tarix_filtri = self.tarix_filtri.get()
                 
-                filtrlenmis_neticeler = []
-                for netice in self.match_results[aktiv_tab]:
-                    # Vaxt filtri
-                    vaxt_uygunlugu = True
-                    if vaxt_filtri != "Hamısı":
-                        vaxt_ferqi = (
-                            netice.time_diff if isinstance(netice.time_diff, (int, float))
-                            else float(netice.time_diff.split('/')[0])
-                        )
-                        if vaxt_filtri == "0-5 dəq":
-                            vaxt_uygunlugu = 0 <= vaxt_ferqi <= 5
-                        elif vaxt_filtri == "5-15 dəq":
-                            vaxt_uygunlugu = 5 < vaxt_ferqi <= 15
-                        elif vaxt_filtri == "15+ dəq":
-                            vaxt_uygunlugu = vaxt_ferqi > 15
-                    
-                    # Sərhəd məntəqəsi filtri
-                    serhed_uygunlugu = serhed_filtri == "Hamısı" or netice.border == serhed_filtri
-                    
-                    # Tarix filtri
-                    tarix_uygunlugu = True
-                    if tarix_filtri != "Hamısı":
-                        netice_tarixi = datetime.strptime(netice.date.split(' - ')[0], '%d.%m.%Y')
-                        bu_gun = datetime.now()
-                        if tarix_filtri == "Bu gün":
-                            tarix_uygunlugu = netice_tarixi.date() == bu_gun.date()
-                        elif tarix_filtri == "Son 3 gün":
-                            tarix_uygunlugu = (bu_gun - netice_tarixi).days <= 3
-                        elif tarix_filtri == "Son həftə":
-                            tarix_uygunlugu = (bu_gun - netice_tarixi).days <= 7
-                    
-                    # Bütün filtrlərə uyğundursa əlavə et
-                    if vaxt_uygunlugu and serhed_uygunlugu and tarix_uygunlugu:
-                        filtrlenmis_neticeler.append(netice)
+                neticeler = self.match_results[aktiv_tab]
                 
-                # Nəticələri göstər və sayları hesabla
-                sexs_sayi = {}
-                for netice in filtrlenmis_neticeler:
-                    sexs_sayi[netice.person_a] = sexs_sayi.get(netice.person_a, 0) + 1
-                    sexs_sayi[netice.person_b] = sexs_sayi.get(netice.person_b, 0) + 1
+                # Vaxt filtri
+                vaxt_ferqi = neticeler.time_diff
+                if vaxt_filtri == "0-5 dəq":
+                    vaxt_uygunlugu = (0 <= vaxt_ferqi) & (vaxt_ferqi <= 5)
+                elif vaxt_filtri == "5-15 dəq":
+                    vaxt_uygunlugu = (5 < vaxt_ferqi) & (vaxt_ferqi <= 15)
+                elif vaxt_filtri == "15+ dəq":
+                    vaxt_uygunlugu = vaxt_ferqi > 15
+                else:
+                    vaxt_uygunlugu = np.ones(len(neticeler), dtype=bool)
                 
-                # Nəticələri sayına görə sırala
-                filtrlenmis_neticeler = sorted(
-                    filtrlenmis_neticeler,
-                    key=lambda x: (
-                        -(sexs_sayi[x.person_a] + sexs_sayi[x.person_b]),  # Sayına görə azalan
-                        float(x.time_diff.split('/')[0]) if isinstance(x.time_diff, str) 
-                        else float(x.time_diff)  # Sonra vaxta görə artan
-                    )
-                )
+                # Sərhəd məntəqəsi filtri
+                if serhed_filtri == "Hamısı":
+                    serhed_uygunlugu = np.ones(len(neticeler), dtype=bool)
+                else:
+                    serhed_uygunlugu = neticeler.border == neticeler.pool.index.get(serhed_filtri, -1)
+                
+                # Tarix filtri
+                tarix_uygunlugu = np.ones(len(neticeler), dtype=bool)
+                if tarix_filtri != "Hamısı":
+                    netice_gunu = neticeler.days()
+                    bu_gun = (datetime.now() - EPOCH).days
+                    if tarix_filtri == "Bu gün":
+                        tarix_uygunlugu = netice_gunu == bu_gun
+                    elif tarix_filtri == "Son 3 gün":
+                        tarix_uygunlugu = bu_gun - netice_gunu <= 3
+                    elif tarix_filtri == "Son həftə":
+                        tarix_uygunlugu = bu_gun - netice_gunu <= 7
+                
+                # Bütün filtrlərə uyğun olanları seç
+                secilenler = vaxt_uygunlugu & serhed_uygunlugu & tarix_uygunlugu
+                
+                # Hazır sıralamadan filtrə uyğun olanları götür (sayılar yenidən hesablanmır)
+                sira = neticeler.rank_order()
+                sira = sira[secilenler[sira]]
                 
                 # Sıralanmış nəticələri göstər
-                for netice in filtrlenmis_neticeler:
-                    self.create_result_row(
-                        self.result_frames[aktiv_tab],
-                        netice,
-                        sexs_sayi,
-                        aktiv_tab
-                    )
+                self.result_frames[aktiv_tab].show(neticeler, sira)
                 
                 # Status panelini yenilə
                 umumi_say = len(self.match_results[aktiv_tab])
-                filtrlenmis_say = len(filtrlenmis_neticeler)
+                filtrlenmis_say = len(sira)
                 self.status_label.configure(
                     text=f"Göstərilən: {filtrlenmis_say}/{umumi_say}"
                 )
@@ -1723,5 +4349,7 @@ class ModernTravelAnalyzer:
             print(f"Tema yüklənmə xətası: {str(e)}")
 
 if __name__ == "__main__":
+    # PyInstaller paketlerinde işçi süreçleri için gerekli
+    multiprocessing.freeze_support()
     app = ModernTravelAnalyzer()
     app.run()
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""Uyğunlaşdırma yollarının sadə iç-içə dövr ilə müqayisəsi"""
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tarvel
+from tarvel import (MatchOptions, PreparedDataset, StringPool, analyze_self, detect_convoys,
+                    iter_pair_blocks, match_datasets, match_indices, match_self, match_top_k,
+                    normalize_name, similar_tokens)
+
+NAMES = ['Aliyev Ali', 'Mammadov Vugar', 'Huseynov Rashad', 'Karimova Leyla', 'Guliyev Elvin']
+BORDERS = ['Bakı', 'Astara', 'Qırmızı Körpü', np.nan, '']
+
+
+def make_frame(seed, rows=60, directions=('Giriş', 'Çıxış')):
+    """Bir neçə günə yayılmış təsadüfi keçidlər"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 3, 1, 22, 0)
+    return pd.DataFrame({
+        'İstiqamət': rng.choice(list(directions), rows),
+        'Keçid zamanı': [
+            (start + timedelta(minutes=int(m))).strftime('%d.%m.%Y %H:%M')
+            for m in rng.integers(0, 3 * 24 * 60, rows)
+        ],
+        'Soyadı, Adı (Lat)': rng.choice(NAMES, rows),
+        'Sərhəd nəzarət məntəqəsi': rng.choice(np.array(BORDERS, dtype=object), rows),
+    })
+
+
+def is_empty(value):
+    return not isinstance(value, str) or not value.strip()
+
+
+def naive_pairs(df1, df2, direction, options):
+    """Əsas faylın iç-içə dövrü ilə eyni qayda"""
+    pairs = set()
+    rows1 = df1[df1['İstiqamət'] == direction]
+    rows2 = df2[df2['İstiqamət'] == direction]
+    for _, row1 in rows1.iterrows():
+        time1 = datetime.strptime(row1['Keçid zamanı'], '%d.%m.%Y %H:%M')
+        for _, row2 in rows2.iterrows():
+            time2 = datetime.strptime(row2['Keçid zamanı'], '%d.%m.%Y %H:%M')
+            if abs((time1 - time2).total_seconds()) / 60 > options.max_time:
+                continue
+            if row1['Soyadı, Adı (Lat)'] == row2['Soyadı, Adı (Lat)']:
+                continue
+            border1, border2 = row1['Sərhəd nəzarət məntəqəsi'], row2['Sərhəd nəzarət məntəqəsi']
+            if not options.cross_border and (is_empty(border1) or border1 != border2):
+                continue
+            pairs.add((row1['Soyadı, Adı (Lat)'], row2['Soyadı, Adı (Lat)'],
+                       time1.strftime('%d.%m.%Y %H:%M'), time2.strftime('%d.%m.%Y %H:%M')))
+    return pairs
+
+
+def store_pairs(store):
+    strings = store.pool.array()
+    fmt = '%d.%m.%Y %H:%M'
+    epoch = datetime(1970, 1, 1)
+    return [
+        (strings[a], strings[b], (epoch + timedelta(minutes=int(ta))).strftime(fmt),
+         (epoch + timedelta(minutes=int(tb))).strftime(fmt))
+        for a, b, ta, tb in zip(store.person_a, store.person_b, store.time_a, store.time_b)
+    ]
+
+
+def prepare(df1, df2):
+    pool = StringPool()
+    return (PreparedDataset.from_frame(df1, pool=pool),
+            PreparedDataset.from_frame(df2, pool=pool))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+@pytest.mark.parametrize('cross_border', [True, False])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_sweep_matches_nested_loop(seed, cross_border, partitioned):
+    df1, df2 = make_frame(seed), make_frame(seed + 100)
+    main, comp = prepare(df1, df2)
+    options = MatchOptions(max_time=45, cross_border=cross_border, partitioned=partitioned)
+    for direction in ['Giriş', 'Çıxış']:
+        store = match_datasets(main, comp, direction, options)
+        pairs = set(store_pairs(store))
+        assert len(store) == len(pairs)
+        assert pairs == naive_pairs(df1, df2, direction, options)
+
+
+@pytest.mark.parametrize('cross_border', [True, False])
+def test_partitioned_equals_sweep(cross_border):
+    df1, df2 = make_frame(7, rows=200), make_frame(8, rows=200)
+    main, comp = prepare(df1, df2)
+    for direction in ['Giriş', 'Çıxış']:
+        flat = match_datasets(main, comp, direction,
+                              MatchOptions(cross_border=cross_border))
+        split = match_datasets(main, comp, direction,
+                               MatchOptions(cross_border=cross_border, partitioned=True))
+        for column in ['person_a', 'person_b', 'border', 'time_a', 'time_b']:
+            np.testing.assert_array_equal(getattr(flat, column), getattr(split, column))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+@pytest.mark.parametrize('cross_border', [True, False])
+def test_empty_direction(cross_border, partitioned):
+    only_entry = make_frame(3, directions=('Giriş',))
+    main, comp = prepare(only_entry, make_frame(4))
+    options = MatchOptions(cross_border=cross_border, partitioned=partitioned)
+    assert len(match_datasets(main, comp, 'Çıxış', options)) == 0
+    assert len(match_datasets(comp, main, 'Çıxış', options)) == 0
+
+
+def test_all_borders_missing():
+    df = make_frame(5)
+    df['Sərhəd nəzarət məntəqəsi'] = np.nan
+    main, comp = prepare(df, make_frame(6))
+    options = MatchOptions(cross_border=False, partitioned=True)
+    assert len(match_datasets(main, comp, 'Giriş', options)) == 0
+
+
+def store_rows(store):
+    strings = store.pool.array()
+    return sorted(zip(strings[store.person_a].tolist(), strings[store.person_b].tolist(),
+                      store.time_a.tolist(), store.time_b.tolist()))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+@pytest.mark.parametrize('top_k', [1, 5, 40])
+def test_top_k_matches_full_ranking(top_k, partitioned):
+    df1, df2 = make_frame(11, rows=150), make_frame(12, rows=150)
+    main, comp = prepare(df1, df2)
+    options = MatchOptions(max_time=60, partitioned=partitioned, top_k=top_k)
+    full_options = MatchOptions(max_time=60, partitioned=partitioned)
+
+    best = match_top_k(main, lambda: [comp], options)
+    for category, direction in [('entry', 'Giriş'), ('exit', 'Çıxış')]:
+        full = match_datasets(main, comp, direction, full_options)
+        assert len(best[category]) == min(top_k, len(full))
+        # Sayılar dosyanın tüm eşleşmelerinden gelir
+        counts = full.person_counts()
+        score = counts[best[category].person_a] + counts[best[category].person_b]
+        full_score = np.sort(counts[full.person_a] + counts[full.person_b])[::-1]
+        np.testing.assert_array_equal(np.sort(score)[::-1], full_score[:top_k])
+
+
+def test_top_k_per_file_counts():
+    df1 = make_frame(13, rows=80)
+    files = [make_frame(14, rows=80), make_frame(15, rows=80)]
+    pool = StringPool()
+    main = PreparedDataset.from_frame(df1, pool=pool)
+    comps = [PreparedDataset.from_frame(df, pool=pool) for df in files]
+    options = MatchOptions(max_time=60, top_k=10)
+
+    # Her dosya kendi sayılarıyla sıralanır: dosya tek başına analiz edilmiş gibi
+    for comp in comps:
+        best = match_top_k(main, lambda: [comp], options)
+        for category, direction in [('entry', 'Giriş'), ('exit', 'Çıxış')]:
+            full = match_datasets(main, comp, direction, MatchOptions(max_time=60))
+            assert store_rows(best[category]) == store_rows(full.top(10))
+
+
+@pytest.mark.parametrize('cross_border', [True, False])
+def test_pair_blocks_are_bounded(cross_border):
+    main, comp = prepare(make_frame(18, rows=150), make_frame(19, rows=150))
+    options = MatchOptions(max_time=60, cross_border=cross_border)
+    for direction in ['Giriş', 'Çıxış']:
+        blocks = list(iter_pair_blocks(main, comp, direction, options, block_rows=7))
+        # Her blok yalnız kendi ana satır aralığının çiftlerini tutar
+        for number, (idx1, _) in enumerate(blocks):
+            assert ((idx1 >= number * 7) & (idx1 < (number + 1) * 7)).all()
+        idx1, idx2 = match_indices(main, comp, direction, options)
+        np.testing.assert_array_equal(np.concatenate([b[0] for b in blocks]), idx1)
+        np.testing.assert_array_equal(np.concatenate([b[1] for b in blocks]), idx2)
+
+
+@pytest.mark.parametrize('top_k', [1, 5, 40])
+def test_small_blocks_keep_top_k(top_k, monkeypatch):
+    monkeypatch.setattr(tarvel, 'iter_pair_blocks', partial(iter_pair_blocks, block_rows=7))
+    monkeypatch.setattr(tarvel, 'iter_self_blocks', partial(tarvel.iter_self_blocks, block_rows=7))
+    df1, df2 = make_frame(20, rows=150), make_frame(21, rows=150)
+    main, comp = prepare(df1, df2)
+    options = MatchOptions(max_time=60, top_k=top_k)
+    full_options = MatchOptions(max_time=60)
+
+    best = match_top_k(main, lambda: [comp], options)
+    own = analyze_self(main, options)
+    for category, direction in [('entry', 'Giriş'), ('exit', 'Çıxış')]:
+        full = match_datasets(main, comp, direction, full_options)
+        assert store_rows(best[category]) == store_rows(full.top(top_k))
+        assert store_rows(own[category]) == store_rows(match_self(main, direction, full_options).top(top_k))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_top_k_empty_side(partitioned):
+    main, comp = prepare(make_frame(16, directions=('Giriş',)), make_frame(17))
+    options = MatchOptions(partitioned=partitioned, top_k=5)
+    for first, second in [(main, comp), (comp, main)]:
+        best = match_top_k(first, lambda: [second], options)
+        assert len(best['exit']) == 0
+        assert len(best['entry']) <= 5
+
+
+def naive_self_pairs(df, direction, options, pool):
+    """Faylın öz içində hər sırasız cüt bir dəfə, A kiçik kodlu şəxs"""
+    rows = df[df['İstiqamət'] == direction].reset_index(drop=True)
+    pairs = []
+    for i in range(len(rows)):
+        for j in range(i + 1, len(rows)):
+            row1, row2 = rows.iloc[i], rows.iloc[j]
+            time1 = datetime.strptime(row1['Keçid zamanı'], '%d.%m.%Y %H:%M')
+            time2 = datetime.strptime(row2['Keçid zamanı'], '%d.%m.%Y %H:%M')
+            if abs((time1 - time2).total_seconds()) / 60 > options.max_time:
+                continue
+            if row1['Soyadı, Adı (Lat)'] == row2['Soyadı, Adı (Lat)']:
+                continue
+            border1, border2 = row1['Sərhəd nəzarət məntəqəsi'], row2['Sərhəd nəzarət məntəqəsi']
+            if not options.cross_border and (is_empty(border1) or border1 != border2):
+                continue
+            if pool.add(row1['Soyadı, Adı (Lat)']) > pool.add(row2['Soyadı, Adı (Lat)']):
+                time1, time2 = time2, time1
+                row1, row2 = row2, row1
+            pairs.append((row1['Soyadı, Adı (Lat)'], row2['Soyadı, Adı (Lat)'],
+                          time1.strftime('%d.%m.%Y %H:%M'), time2.strftime('%d.%m.%Y %H:%M')))
+    return sorted(pairs)
+
+
+@pytest.mark.parametrize('cross_border', [True, False])
+def test_self_match_orientation(cross_border):
+    df = make_frame(60, rows=120)
+    main = PreparedDataset.from_frame(df)
+    options = MatchOptions(max_time=40, cross_border=cross_border)
+    results = analyze_self(main, options)
+    for category, direction in [('entry', 'Giriş'), ('exit', 'Çıxış')]:
+        store = results[category]
+        # A her zaman küçük kodlu kişi: giriş ve çıkış çiftleri aynı yönde
+        assert (store.person_a < store.person_b).all()
+        assert sorted(store_pairs(store)) == naive_self_pairs(df, direction, options, main.pool)
+    if cross_border:
+        assert len(results['complete']) > 0
+
+
+VARIANT_NAMES = [
+    'Mammadov Vugar', 'Mamedov Vugar', 'MAMMADOV VUQAR', 'Məmmədov Vüqar',
+    'Aliyev Ali', 'Aliev Ali', 'Alıyev Vali', 'Huseynov Rashad', 'Guseynov Rashad',
+    'Hüseynov Rəşad', 'Karimova Leyla', 'Kerimova Leyla', 'Guliyev Elvin', 'Quliyev Elvin',
+    'Abdullayev Tural', 'Abdulayev Tural', 'Ismayilov Samir', 'Ismailov Samir', np.nan,
+]
+
+
+def naive_identities(strings):
+    """Bütün unikal söz cütlərini müqayisə edən union-find"""
+    tokens = sorted({token for value in strings for token in normalize_name(value)})
+    parent = {token: token for token in tokens}
+
+    def find(token):
+        while parent[token] != token:
+            token = parent[token]
+        return token
+
+    for i, first in enumerate(tokens):
+        for second in tokens[i + 1:]:
+            if similar_tokens(first, second):
+                parent[max(find(first), find(second))] = min(find(first), find(second))
+    return [tuple(find(token) for token in normalize_name(value)) or ('#', code)
+            for code, value in enumerate(strings)]
+
+
+def partition(labels):
+    groups = {}
+    return [groups.setdefault(label, len(groups)) for label in labels]
+
+
+def test_blocked_name_index_matches_pairwise_union_find():
+    pool = StringPool(VARIANT_NAMES)
+    identities = pool.identities()
+    assert partition(identities.tolist()) == partition(naive_identities(pool.strings))
+    # Varyantlar birleşir, farklı kişiler ayrı kalır
+    assert identities[pool.add('Mamedov Vugar')] == identities[pool.add('Mammadov Vugar')]
+    assert identities[pool.add('Məmmədov Vüqar')] == identities[pool.add('MAMMADOV VUQAR')]
+    assert identities[pool.add('Aliyev Ali')] != identities[pool.add('Alıyev Vali')]
+
+
+def test_name_index_is_incremental():
+    pool = StringPool(VARIANT_NAMES[:9])
+    pool.identities()
+    for name in VARIANT_NAMES[9:]:
+        pool.add(name)
+    assert partition(pool.identities().tolist()) == \
+        partition(StringPool(VARIANT_NAMES).identities().tolist())
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_name_index_updates_match_full_rebuild(seed):
+    # Sonradan gələn söz köhnə qrupları birləşdirə bilər: hər addım tam qurulma ilə eyni olmalıdır
+    names = VARIANT_NAMES + ['Abdulla Tural', 'Abdullaev Turall', 'Mamedova Vugara', 'Rashad Huseyn']
+    names = [names[i] for i in np.random.default_rng(seed).permutation(len(names))]
+    pool = StringPool()
+    for name in names:
+        pool.add(name)
+        assert partition(pool.identities().tolist()) == \
+            partition(naive_identities(pool.strings))
+
+
+def test_fuzzy_names_drop_variant_pairs():
+    df = make_frame(70, rows=80)
+    df.loc[::2, 'Soyadı, Adı (Lat)'] = 'Mammadov Vugar'
+    df.loc[1::2, 'Soyadı, Adı (Lat)'] = 'Mamedov Vugar'
+    main, comp = prepare(df, df)
+    assert len(match_datasets(main, comp, 'Giriş', MatchOptions(max_time=60))) > 0
+    assert len(match_datasets(main, comp, 'Giriş', MatchOptions(max_time=60, fuzzy_names=True))) == 0
+
+
+def test_convoy_found_in_crowded_windows():
+    # Saatda 100 keçidlik fonda 30 dəqiqəlik pəncərələr CONVOY_MAX_WINDOW-dan böyükdür
+    rng = np.random.default_rng(5)
+    rows = []
+    for day in range(3):
+        start = datetime(2024, 3, 2 + day)
+        for number, minute in enumerate(rng.uniform(0, 24 * 60, 2400)):
+            rows.append((start + timedelta(minutes=float(minute)), f'Fon {day} {number}'))
+        for offset, name in enumerate(['Qrup A', 'Qrup B', 'Qrup C']):
+            rows.append((start + timedelta(hours=10, minutes=2 * offset + day), name))
+    df = pd.DataFrame({
+        'Keçid zamanı': [time.strftime('%d.%m.%Y %H:%M') for time, _ in rows],
+        'Soyadı, Adı (Lat)': [name for _, name in rows],
+        'İstiqamət': 'Giriş',
+        'Sərhəd nəzarət məntəqəsi': 'Qırmızı Körpü',
+    })
+    convoys = detect_convoys([PreparedDataset.from_frame(df)], max_time=30, min_days=2)
+    assert [(convoy.members, convoy.days) for convoy in convoys] == [(['Qrup A', 'Qrup B', 'Qrup C'], 3)]
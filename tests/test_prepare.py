@@ -0,0 +1,99 @@
+"""Faylların hazırlanması: boş hüceyrələr və axınla oxunan faylların keşi"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import tarvel
+from tarvel import MatchOptions, PreparedDataset, StringPool
+
+from test_matching import make_frame, store_rows
+
+
+def test_empty_cells_share_code():
+    df = pd.DataFrame({
+        'İstiqamət': ['Giriş'] * 5,
+        'Keçid zamanı': ['01.03.2024 10:00'] * 5,
+        'Soyadı, Adı (Lat)': ['Aliyev Ali', None, np.nan, '', '  '],
+        'Sərhəd nəzarət məntəqəsi': [None, np.nan, '', ' ', 'Bakı'],
+    })
+    dataset = PreparedDataset.from_frame(df)
+    data = dataset.directions['Giriş']
+    assert len(set(data.names[1:].tolist())) == 1
+    assert len(set(data.borders[:4].tolist())) == 1
+    missing = dataset.pool.missing()
+    assert missing[data.borders].tolist() == [True, True, True, True, False]
+
+
+def test_pool_codes_survive_cache_round_trip():
+    pool = StringPool(['Bakı', np.nan, 'Astara'])
+    assert pool.add(None) == pool.add('') == 1
+    assert len(StringPool(pool.array())) == len(pool)
+
+
+def test_streamed_file_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarvel, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(tarvel, 'STREAM_MIN_BYTES', 0)
+    main = PreparedDataset.from_frame(make_frame(21, rows=120))
+    comp_file = str(tmp_path / 'comp.csv')
+    make_frame(22, rows=120).to_csv(comp_file, index=False)
+
+    streamed = tarvel.analyze_comparison_file(main, comp_file, MatchOptions())
+    cached = tarvel.load_cached_dataset(comp_file)
+    assert cached is not None and len(cached) == 120
+
+    again = tarvel.analyze_comparison_file(main, comp_file, MatchOptions())
+    for category in ['entry', 'exit', 'complete']:
+        assert store_rows(streamed[category]) == store_rows(again[category])
+
+
+def test_streamed_top_k_replays_spooled_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarvel, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(tarvel, 'STREAM_MIN_BYTES', 0)
+    monkeypatch.setattr(tarvel.tempfile, 'tempdir', str(tmp_path))
+    chunks = tarvel.iter_dataset_chunks
+    monkeypatch.setattr(tarvel, 'iter_dataset_chunks', lambda path, pool: chunks(path, pool, 25))
+    main = PreparedDataset.from_frame(make_frame(26, rows=120))
+    comp_file = str(tmp_path / 'comp.csv')
+    make_frame(27, rows=120).to_csv(comp_file, index=False)
+    options = MatchOptions(top_k=15)
+
+    # İkinci keçid faylı yenidən oxumaz, diskə yazılmış hissələri istifadə edir
+    streamed = tarvel.analyze_comparison_file(main, comp_file, options)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(tarvel.SPILL_PREFIX)]
+
+    cached = tarvel.load_cached_dataset(comp_file)
+    parsed = PreparedDataset.from_frame(pd.read_csv(comp_file))
+    for direction in ['Giriş', 'Çıxış']:
+        data, expected = cached.directions[direction], parsed.directions[direction]
+        np.testing.assert_array_equal(data.times, expected.times)
+        np.testing.assert_array_equal(data.order, expected.order)
+        for field in ['names', 'borders']:
+            assert (cached.pool.array()[getattr(data, field)].astype(str).tolist() ==
+                    parsed.pool.array()[getattr(expected, field)].astype(str).tolist())
+
+    again = tarvel.analyze_comparison_file(main, comp_file, options)
+    for category in ['entry', 'exit', 'complete']:
+        assert store_rows(streamed[category]) == store_rows(again[category])
+
+
+def test_process_pool_matches_in_process(tmp_path, monkeypatch):
+    import concurrent.futures
+    monkeypatch.setattr(tarvel, 'CACHE_DIR', str(tmp_path / 'cache'))
+    main = PreparedDataset.from_frame(make_frame(23, rows=120))
+    files = []
+    for seed in [24, 25]:
+        files.append(str(tmp_path / f'comp{seed}.csv'))
+        make_frame(seed, rows=120).to_csv(files[-1], index=False)
+
+    options = MatchOptions(max_time=45)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(tarvel.analyze_comparison_file, main, path, options)
+                   for path in files]
+        pooled = [future.result() for future in futures]
+
+    for path, results in zip(files, pooled):
+        local = tarvel.analyze_comparison_file(main, path, options)
+        for category in ['entry', 'exit', 'complete']:
+            # Süreçten dönen kodlar oturum havuzuna çevrilir
+            assert store_rows(results[category].intern(main.pool)) == store_rows(local[category])
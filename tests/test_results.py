@@ -0,0 +1,165 @@
+"""Nəticə mağazası üzərindəki alqoritmlərin sadə dövrlərlə müqayisəsi"""
+import numpy as np
+import pytest
+
+from tarvel import (MatchOptions, MatchStore, format_minutes, match_complete, match_datasets,
+                    unique_masks)
+
+from test_matching import make_frame, prepare
+
+
+def match_pair(seed, max_time=60, rows=120):
+    main, comp = prepare(make_frame(seed, rows=rows), make_frame(seed + 1, rows=rows))
+    options = MatchOptions(max_time=max_time)
+    return (match_datasets(main, comp, 'Giriş', options),
+            match_datasets(main, comp, 'Çıxış', options))
+
+
+def naive_complete(entries, exits):
+    """Əsas faylın find_complete_matches dövrü"""
+    rows, seen = [], set()
+    for i in range(len(entries)):
+        for j in range(len(exits)):
+            same = (entries.person_a[i] == exits.person_a[j] and
+                    entries.person_b[i] == exits.person_b[j] and
+                    entries.border[i] == exits.border[j])
+            if same and exits.time_a[j] > entries.time_a[i]:
+                key = (entries.person_a[i], entries.person_b[i],
+                       entries.time_a[i] // 1440, exits.time_a[j] // 1440)
+                if key not in seen:
+                    seen.add(key)
+                    rows.append((entries.person_a[i], entries.person_b[i], entries.border[i],
+                                 entries.time_a[i], entries.time_b[i],
+                                 exits.time_a[j], exits.time_b[j]))
+    return rows
+
+
+def test_hash_join_complete_matches_nested_loop():
+    for seed in [30, 32, 34]:
+        entries, exits = match_pair(seed)
+        complete = match_complete(entries, exits)
+        rows = list(zip(complete.person_a, complete.person_b, complete.border,
+                        complete.time_a, complete.time_b,
+                        complete.exit_time_a, complete.exit_time_b))
+        assert len(rows) > 0
+        assert rows == naive_complete(entries, exits)
+
+
+def test_complete_matches_with_empty_side():
+    entries, exits = match_pair(36)
+    assert len(match_complete(entries, exits.take(np.array([], dtype=np.int64)))) == 0
+    assert len(match_complete(entries.take(np.array([], dtype=np.int64)), exits)) == 0
+
+
+def records(store):
+    return [(row.person_a, row.person_b, row.border, row.date, row.time, row.diff_text)
+            for row in store]
+
+
+def test_concat_interns_pools_and_applies_masks():
+    # Ayrı havuzlarla kodlanmış mağazalar ilk mağazanın havuzuna çevrilir
+    stores = [match_pair(40)[0], match_pair(42)[0]]
+    assert stores[0].pool is not stores[1].pool
+    masks = [np.asarray(store.time_diff) <= 20 for store in stores]
+    merged = MatchStore.concat(stores, masks=masks)
+
+    expected = []
+    for store, mask in zip(stores, masks):
+        expected += [record for record, keep in zip(records(store), mask) if keep]
+    assert merged.pool is stores[0].pool
+    assert records(merged) == expected
+
+
+def test_spilled_store_round_trip(tmp_path):
+    entries, exits = match_pair(44)
+    for store in [entries, match_complete(entries, exits)]:
+        spilled = MatchStore.concat([store], store.is_complete, str(tmp_path))
+        assert spilled.is_spilled
+        assert records(spilled) == records(store)
+        order = spilled.rank_order()
+        np.testing.assert_array_equal(order, store.rank_order())
+        spilled.discard()
+    assert not list(tmp_path.iterdir())
+
+
+def naive_unique(stores, symmetric):
+    seen, masks = set(), []
+    for store in stores:
+        strings = store.pool.array()
+        mask = []
+        for row in range(len(store)):
+            a, b = strings[store.person_a[row]], strings[store.person_b[row]]
+            ta, tb = store.time_a[row], store.time_b[row]
+            if symmetric:
+                # Cütün adları hər zaman fərqlidir, ada görə sıralamaq kifayətdir
+                if a > b:
+                    a, b, ta, tb = b, a, tb, ta
+                key = (a, b, ta, tb)
+            else:
+                key = (a, b, strings[store.border[row]], ta, tb)
+            mask.append(key not in seen)
+            seen.add(key)
+        masks.append(mask)
+    return masks
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 50000])
+def test_unique_masks_match_naive_keys(chunk_rows, tmp_path):
+    df1, df2 = make_frame(50, rows=100), make_frame(51, rows=100)
+    options = MatchOptions(max_time=45)
+    main, comp = prepare(df1, df2)
+    again, _ = prepare(df1, df2)       # Aynı dosya ikinci kez, başka havuzla
+    stores = [match_datasets(main, comp, 'Giriş', options),
+              match_datasets(again, comp, 'Giriş', options),
+              match_datasets(comp, main, 'Giriş', options)]   # B/A yönü
+    stores[1] = stores[1].spill(str(tmp_path))    # Diske yazılmış parça da hissə-hissə okunur
+
+    for symmetric in [False, True]:
+        masks = unique_masks(stores, symmetric, chunk_rows)
+        expected = naive_unique(stores, symmetric)
+        assert [mask.tolist() for mask in masks] == expected
+    assert not unique_masks(stores)[1].any()
+    assert not unique_masks(stores, symmetric=True)[2].any()
+
+
+def test_summary_matches_naive_pair_groups():
+    entries, _ = match_pair(82, rows=150)
+    groups = {}
+    for row in range(len(entries)):
+        key = frozenset([entries.person_a[row], entries.person_b[row]])
+        groups.setdefault(key, []).append(row)
+
+    summary = entries.summary
+    for rows in groups.values():
+        times = [int(entries.time_a[row]) for row in rows]
+        borders = {int(entries.border[row]) for row in rows}
+        first = format_minutes(min(times), '%d.%m.%Y')
+        last = format_minutes(max(times), '%d.%m.%Y')
+        period = first if first == last else f"{first} - {last}"
+        for row in rows:
+            assert summary.repeats[row] == len(rows)
+            assert summary.period_text(row) == f"{period} ({len(borders)} məntəqə)"
+
+
+def naive_search(store, text):
+    """Sıralanmış sətirlər üzərində substring süzgəci"""
+    text = text.lower()
+    strings = store.pool.array()
+    order = store.rank_order()
+    return np.array([
+        row for row in order
+        if any(text in str(strings[code]).lower()
+               for code in (store.person_a[row], store.person_b[row], store.border[row]))
+        or text in store.row(row).date.lower()
+    ], dtype=np.int64)
+
+
+def test_trigram_search_matches_substring_filter():
+    entries, exits = match_pair(80, rows=200)
+    queries = ['', 'a', 'ov', 'mam', 'aliyev ali', 'ALIYEV', 'bakı', 'körpü',
+               '01.03', '02.03.2024', '2024 - 0', 'xyz', 'nan']
+    for store in [entries, match_complete(entries, exits)]:
+        assert len(store) > 0
+        for query in queries:
+            found = store.search_index.find(query)
+            np.testing.assert_array_equal(found, naive_search(store, query), err_msg=query)